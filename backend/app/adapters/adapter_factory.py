@@ -4,7 +4,13 @@ Dynamically returns the correct database adapter based on the database type.
 New adapters can be plugged in here without modifying any other code.
 """
 
-from typing import Dict, Any
+import asyncio
+import hashlib
+import orjson
+import time
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
+from cachetools import TTLCache
 from app.adapters.base_adapter import BaseDatabaseAdapter
 from app.adapters.google_sheets_adapter import GoogleSheetsAdapter
 from app.models.models import DatabaseType
@@ -20,8 +26,6 @@ ADAPTER_REGISTRY: Dict[DatabaseType, type] = {
     # DatabaseType.EXCEL: ExcelAdapter,
 }
 
-from typing import Dict, Any, Optional
-
 async def get_adapter(db_type: DatabaseType, connection_config: Dict[str, Any], refresh_token: Optional[str] = None) -> BaseDatabaseAdapter:
     """
     Factory function: returns a connected adapter instance for the given DB type.
@@ -34,3 +38,101 @@ async def get_adapter(db_type: DatabaseType, connection_config: Dict[str, Any],
     adapter = adapter_class()
     await adapter.connect(connection_config, refresh_token=refresh_token)
     return adapter
+
+
+# ── Connected Adapter Cache ───────────────────────────────
+# Connecting costs OAuth + spreadsheet lookups, so warm adapters are reused for
+# ADAPTER_CACHE_TTL seconds per (db_type, connection_config, refresh_token).
+
+ADAPTER_CACHE_TTL = 600
+
+
+@dataclass
+class CachedAdapter:
+    adapter: BaseDatabaseAdapter
+    expires_at: float
+
+
+_ADAPTER_CACHE: Dict[str, CachedAdapter] = {}
+_ADAPTER_LOCKS: Dict[str, asyncio.Lock] = {}
+
+
+def _adapter_cache_key(db_type: DatabaseType, connection_config: Dict[str, Any], refresh_token: Optional[str]) -> str:
+    raw = orjson.dumps(
+        [db_type.value, connection_config, refresh_token],
+        default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+    )
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+async def get_cached_adapter(db_type: DatabaseType, connection_config: Dict[str, Any], refresh_token: Optional[str] = None) -> BaseDatabaseAdapter:
+    """
+    Like get_adapter, but returns a warm adapter connected within the last
+    ADAPTER_CACHE_TTL seconds. Concurrent callers for the same key share one connect.
+    """
+    key = _adapter_cache_key(db_type, connection_config, refresh_token)
+
+    entry = _ADAPTER_CACHE.get(key)
+    if entry and entry.expires_at > time.monotonic():
+        return entry.adapter
+
+    lock = _ADAPTER_LOCKS.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            # Double-checked: another caller may have connected while we waited
+            entry = _ADAPTER_CACHE.get(key)
+            if entry and entry.expires_at > time.monotonic():
+                return entry.adapter
+
+            adapter = await get_adapter(db_type, connection_config, refresh_token=refresh_token)
+            _ADAPTER_CACHE[key] = CachedAdapter(adapter=adapter, expires_at=time.monotonic() + ADAPTER_CACHE_TTL)
+            return adapter
+    finally:
+        # Locks only matter while a connect is in flight; don't keep one per key forever
+        if not lock.locked():
+            _ADAPTER_LOCKS.pop(key, None)
+
+
+def invalidate_cached_adapter(db_type: DatabaseType, connection_config: Dict[str, Any], refresh_token: Optional[str] = None) -> None:
+    """Drop a pooled adapter so the next caller reconnects (e.g. after the connection was edited)."""
+    key = _adapter_cache_key(db_type, connection_config, refresh_token)
+    _ADAPTER_CACHE.pop(key, None)
+    adapter_class = ADAPTER_REGISTRY.get(db_type)
+    if adapter_class:
+        # Process-wide handles (e.g. Sheets spreadsheet + headers) outlive the pooled adapter
+        adapter_class.invalidate_shared_state(connection_config)
+
+
+async def close_all() -> None:
+    """Close every pooled adapter; called from the app lifespan on shutdown."""
+    entries = list(_ADAPTER_CACHE.values())
+    _ADAPTER_CACHE.clear()
+    _ADAPTER_LOCKS.clear()
+    for entry in entries:
+        try:
+            await entry.adapter.close()
+        except Exception as e:
+            print(f"[ADAPTER FACTORY] ⚠️ Error closing adapter: {e}")
+
+
+# ── Header Cache ─────────────────────────────────────────
+# Login only needs the headers to confirm the primary key still exists, so a
+# recent answer per DatabaseConnection id is good enough.
+
+HEADER_CACHE_TTL = 60
+
+HEADER_CACHE: TTLCache = TTLCache(maxsize=512, ttl=HEADER_CACHE_TTL)
+
+
+async def get_cached_headers(adapter: BaseDatabaseAdapter, conn_id: str) -> List[str]:
+    """Headers of the connection's default table, fetched at most once per HEADER_CACHE_TTL."""
+    headers = HEADER_CACHE.get(conn_id)
+    if headers is None:
+        headers = await adapter.get_headers()
+        HEADER_CACHE[conn_id] = headers
+    return headers
+
+
+def invalidate_cached_headers(conn_id: str) -> None:
+    """Evict on suspected schema drift so the next caller re-fetches."""
+    HEADER_CACHE.pop(conn_id, None)
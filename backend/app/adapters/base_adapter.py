@@ -5,7 +5,7 @@ This ensures the system is fully extensible (Google Sheets, PostgreSQL, MongoDB,
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 
 
 class BaseDatabaseAdapter(ABC):
@@ -30,18 +30,26 @@ class BaseDatabaseAdapter(ABC):
         pass
 
     @abstractmethod
-    async def get_all_records(self, table_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Fetch all records from the data source."""
+    async def get_all_records(self, table_name: Optional[str] = None, force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """Fetch all records from the data source. Adapters may cache; force_refresh bypasses it."""
         pass
 
     @abstractmethod
-    async def get_record_by_key(self, key_column: str, key_value: str, table_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        """Fetch a single record by its primary key value."""
+    async def get_record_by_key(
+        self,
+        key_column: str,
+        key_value: str,
+        table_name: Optional[str] = None,
+        columns: Optional[Iterable[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch a single record by its primary key value.
+        If `columns` is given, only those fields need to be returned."""
         pass
 
     @abstractmethod
-    async def get_records_by_filter(self, filters: Dict[str, Any], table_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Fetch records matching the given filter criteria."""
+    def get_records_by_filter(self, filters: Dict[str, Any], table_name: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield records matching the given filter criteria (implement as an async generator).
+        Callers that need a list can collect it with [r async for r in ...]."""
         pass
 
     @abstractmethod
@@ -49,11 +57,31 @@ class BaseDatabaseAdapter(ABC):
         """Update a single record identified by key_column = key_value."""
         pass
 
+    async def update_records(self, key_column: str, updates_by_key: List[Tuple[str, Dict[str, Any]]],
+                             table_name: Optional[str] = None) -> Dict[str, bool]:
+        """Update several records at once; returns {key_value: updated}.
+        Adapters with a bulk write API should override this one-by-one fallback."""
+        results = {}
+        for key_value, updates in updates_by_key:
+            results[key_value] = await self.update_record(key_column, key_value, updates, table_name)
+        return results
+
     @abstractmethod
     async def add_column(self, column_name: str, default_values: Optional[List[Any]] = None, table_name: Optional[str] = None) -> bool:
         """Add a new column to the data source."""
         pass
 
+    async def add_columns(self, column_names: List[str], table_name: Optional[str] = None) -> List[str]:
+        """Add several columns at once; returns the names actually created.
+        Adapters with a bulk schema API should override this single-column fallback."""
+        headers = await self.get_headers(table_name)
+        created = []
+        for name in column_names:
+            if name and name not in headers and name not in created:
+                await self.add_column(name, table_name=table_name)
+                created.append(name)
+        return created
+
     @abstractmethod
     async def update_column_values(self, column_name: str, key_column: str,
                                     key_value_map: Dict[str, Any], table_name: Optional[str] = None) -> bool:
@@ -69,3 +97,16 @@ class BaseDatabaseAdapter(ABC):
     async def create_record(self, data: Dict[str, Any], table_name: Optional[str] = None) -> bool:
         """Create a new record in the data source."""
         pass
+
+    async def batch_read(self, ranges: List[str], table_name: Optional[str] = None) -> List[List[List[Any]]]:
+        """Read several ranges in one round trip. Optional: adapters without a batch API may skip it."""
+        raise NotImplementedError(f"{type(self).__name__} does not support batch_read")
+
+    @classmethod
+    def invalidate_shared_state(cls, config: Dict[str, Any]) -> None:
+        """Drop any process-wide state cached for this connection (handles, headers). Optional."""
+        return None
+
+    async def close(self) -> None:
+        """Release connections/sessions held by the adapter. Pooled adapters are closed on shutdown."""
+        return None
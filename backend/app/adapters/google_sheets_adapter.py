@@ -4,10 +4,13 @@ Implements BaseDatabaseAdapter for Google Sheets.
 This is the DEFAULT adapter used for employee data.
 """
 
-import json
+import asyncio
+import math
+import time
 import gspread
 from google.oauth2.credentials import Credentials
-from typing import Any, Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from typing import Any, AsyncIterator, Dict, FrozenSet, Iterable, List, Optional, Tuple
 from app.adapters.base_adapter import BaseDatabaseAdapter
 from app.config import settings
 
@@ -17,6 +20,104 @@ SCOPES = [
     "https://www.googleapis.com/auth/drive",
 ]
 
+# ── Process-wide Handle Caches ────────────────────────────
+# Authorizing a client and resolving a spreadsheet by key each cost a full
+# HTTPS round trip. Adapters are created per operation, so we keep the warm
+# client (keyed by refresh token) and the resolved spreadsheet/worksheet
+# handles (keyed by refresh token + spreadsheet_id + sheet_name, so a handle is
+# only ever reused by the credentials that opened it) at module level.
+
+_CLIENT_CACHE: Dict[str, gspread.Client] = {}
+_SPREADSHEET_CACHE: Dict[Tuple[str, str, Optional[str]], Tuple[Any, Any, List[str], float]] = {}
+_SPREADSHEET_CACHE_TTL = 300  # seconds before re-resolving spreadsheet metadata
+_RECORDS_CACHE_TTL = 30       # seconds a get_all_records() snapshot is served from memory
+_KEY_INDEX_READ_TTL = 300     # reads re-check the row's key cell before trusting the index; writes never reuse it
+_FILTER_CHUNK_ROWS = 1000     # rows fetched per request while scanning in get_records_by_filter
+
+# ── Quota Handling ────────────────────────────────────────
+# Sheets enforces per-minute read/write quotas; 429/503 responses are transient
+# and retried with exponential backoff. Writes from all concurrent agent runs
+# share one semaphore so the process throttles itself before Google does, and
+# each spreadsheet's writes pass a token bucket sized just under the quota.
+
+_RETRYABLE_STATUS = {429, 503}
+_MAX_ATTEMPTS = 5
+_BACKOFF_BASE = 0.5   # seconds; doubles per attempt
+_BACKOFF_MAX = 30
+_WRITE_SEMAPHORE = asyncio.Semaphore(10)
+
+
+class _TokenBucket:
+    """At most `rate` acquisitions per `period` seconds (bursts up to `rate`); waiters queue FIFO."""
+
+    def __init__(self, rate: int, period: float):
+        self._capacity = float(rate)
+        self._tokens = float(rate)
+        self._fill_rate = rate / period
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._fill_rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._fill_rate)
+
+
+_WRITE_BUCKETS: Dict[str, _TokenBucket] = {}  # spreadsheet_id → write limiter
+
+
+def _write_bucket(spreadsheet_id: str) -> _TokenBucket:
+    bucket = _WRITE_BUCKETS.get(spreadsheet_id)
+    if bucket is None:
+        bucket = _WRITE_BUCKETS[spreadsheet_id] = _TokenBucket(max(1, settings.sheets_writes_per_minute), 60)
+    return bucket
+
+
+def _parse_spreadsheet_id(raw: str) -> str:
+    """Extract the spreadsheet ID if a full URL was provided."""
+    if "spreadsheets/d/" in raw:
+        parts = raw.split("spreadsheets/d/")
+        if len(parts) > 1:
+            return parts[1].split("/")[0]
+    return raw
+
+
+def _drop_spreadsheet_handles(spreadsheet_id: str) -> None:
+    """Forget cached handles/headers for a spreadsheet under every refresh token."""
+    for key in [k for k in _SPREADSHEET_CACHE if k[1] == spreadsheet_id]:
+        del _SPREADSHEET_CACHE[key]
+
+
+def _get_client(refresh_token: str) -> gspread.Client:
+    """Return a cached gspread client for this refresh token, authorizing once per process."""
+    client = _CLIENT_CACHE.get(refresh_token)
+    if client is not None:
+        return client
+
+    # Rebuild OAuth credentials using the stored refresh token
+    credentials = Credentials(
+        None, # Empty access token (force refresh)
+        refresh_token=refresh_token,
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id=settings.google_oauth_client_id,
+        client_secret=settings.google_oauth_client_secret
+    )
+    client = gspread.authorize(credentials)
+
+    # Keep-alive pool so consecutive calls reuse the same TLS connection; sized to the
+    # I/O thread pool so concurrent to_thread calls don't queue for a socket
+    pool = max(10, settings.io_thread_pool_size)
+    client.http_client.session.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=pool))
+
+    _CLIENT_CACHE[refresh_token] = client
+    return client
+
 
 class GoogleSheetsAdapter(BaseDatabaseAdapter):
     """
@@ -32,8 +133,14 @@ class GoogleSheetsAdapter(BaseDatabaseAdapter):
         self.client: Optional[gspread.Client] = None
         self.spreadsheet = None
         self.worksheet = None
-        self.worksheet = None
         self._headers_cache: Dict[str, List[str]] = {}
+        # Per-worksheet get_all_records() snapshot: {title: (records, fetched_at)}
+        self._records_cache: Dict[str, Tuple[List[Dict[str, Any]], float]] = {}
+        # Stripped/lower-cased column shadows of that snapshot: {title: {column: [values]}}
+        self._normalized_cache: Dict[str, Dict[str, List[str]]] = {}
+        # Normalised key value → 1-based row number: {(title, key_column): (index, built_at)}
+        self._key_index: Dict[Tuple[str, str], Tuple[Dict[str, int], float]] = {}
+        self._api_call_count = 0  # Sheets API requests issued by this adapter (quota telemetry)
 
     async def connect(self, config: Dict[str, Any], refresh_token: Optional[str] = None) -> None:
         """Connect to Google Sheets using the HR's OAuth refresh token."""
@@ -46,11 +153,7 @@ class GoogleSheetsAdapter(BaseDatabaseAdapter):
             raise ValueError("spreadsheet_id (or a link) is required in connection_config.")
             
         # Extract ID if a full URL is provided
-        spreadsheet_id = raw_spreadsheet_input
-        if "spreadsheets/d/" in raw_spreadsheet_input:
-            parts = raw_spreadsheet_input.split("spreadsheets/d/")
-            if len(parts) > 1:
-                spreadsheet_id = parts[1].split("/")[0]
+        spreadsheet_id = _parse_spreadsheet_id(raw_spreadsheet_input)
 
         if not refresh_token:
             refresh_token = config.get("google_refresh_token")
@@ -59,28 +162,82 @@ class GoogleSheetsAdapter(BaseDatabaseAdapter):
             print("[GOOGLE SHEETS] ❌ ERROR: No OAuth refresh_token provided for company.")
             raise ValueError("Company must connect their Google Workspace first to access the sheet.")
 
-        # Rebuild OAuth credentials using the stored refresh token
-        credentials = Credentials(
-            None, # Empty access token (force refresh)
-            refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.google_oauth_client_id,
-            client_secret=settings.google_oauth_client_secret
-        )
-        self.client = gspread.authorize(credentials)
-
-        self.spreadsheet = self.client.open_by_key(spreadsheet_id)
+        self.client = _get_client(refresh_token)
+
+        # Reuse the already-resolved spreadsheet handle when it is still fresh
+        cache_key = (refresh_token, spreadsheet_id, sheet_name)
+        cached = _SPREADSHEET_CACHE.get(cache_key)
+        if cached and time.monotonic() - cached[3] < _SPREADSHEET_CACHE_TTL:
+            self.spreadsheet, self.worksheet, headers, _ = cached
+            self._headers_cache[self.worksheet.title] = headers
+            print(f"[GOOGLE SHEETS] ♻️ Reusing cached handle for Spreadsheet '{self.spreadsheet.title}' (ID: {spreadsheet_id})")
+            return
+
+        self.spreadsheet = await self._call(self.client.open_by_key, spreadsheet_id)
         print(f"[GOOGLE SHEETS] ✅ SUCCESS: Connected to Spreadsheet '{self.spreadsheet.title}' (ID: {spreadsheet_id})")
 
         if sheet_name:
-            self.worksheet = self.spreadsheet.worksheet(sheet_name)
+            self.worksheet = await self._call(self.spreadsheet.worksheet, sheet_name)
             print(f"[GOOGLE SHEETS] 📄 Connected to specific worksheet: '{sheet_name}'")
         else:
             self.worksheet = self.spreadsheet.sheet1
             print(f"[GOOGLE SHEETS] 📄 Connected to default worksheet1: '{self.worksheet.title}'")
 
         # Cache headers for default worksheet
-        self._headers_cache[self.worksheet.title] = self.worksheet.row_values(1)
+        headers = await self._call(self.worksheet.row_values, 1)
+        self._headers_cache[self.worksheet.title] = headers
+        _SPREADSHEET_CACHE[cache_key] = (self.spreadsheet, self.worksheet, headers, time.monotonic())
+
+    async def close(self) -> None:
+        """Close the HTTP session of this adapter's gspread client (shared per refresh token)."""
+        client, self.client = self.client, None
+        self.spreadsheet = self.worksheet = None
+        if client is None:
+            return
+        # Later callers re-authorize instead of reusing a closed session
+        tokens = {token for token, cached in _CLIENT_CACHE.items() if cached is client}
+        for token in tokens:
+            del _CLIENT_CACHE[token]
+        for key in [k for k in _SPREADSHEET_CACHE if k[0] in tokens]:
+            del _SPREADSHEET_CACHE[key]
+        client.http_client.session.close()
+
+    @classmethod
+    def invalidate_shared_state(cls, config: Dict[str, Any]) -> None:
+        """Drop the shared spreadsheet handle and cached headers for this connection."""
+        raw = config.get("spreadsheet_id", "")
+        if raw:
+            _drop_spreadsheet_handles(_parse_spreadsheet_id(raw))
+
+    async def _call(self, fn, *args, write: bool = False, **kwargs):
+        """Run a blocking gspread call in a worker thread so the event loop keeps serving.
+        429/503 are retried with exponential backoff; writes share a global semaphore."""
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            self._api_call_count += 1
+            try:
+                if write:
+                    await _write_bucket(self.spreadsheet.id).acquire()
+                    async with _WRITE_SEMAPHORE:
+                        return await asyncio.to_thread(fn, *args, **kwargs)
+                return await asyncio.to_thread(fn, *args, **kwargs)
+            except gspread.exceptions.APIError as e:
+                status = getattr(e, "code", None)
+                if status not in _RETRYABLE_STATUS or attempt == _MAX_ATTEMPTS:
+                    raise
+                delay = min(_BACKOFF_MAX, _BACKOFF_BASE * 2 ** attempt)
+                print(f"[GOOGLE SHEETS] ⏳ API {status} on {getattr(fn, '__name__', 'call')}, retrying in {delay:.1f}s (attempt {attempt}/{_MAX_ATTEMPTS})")
+                await asyncio.sleep(delay)
+
+    @property
+    def api_call_count(self) -> int:
+        """Number of Sheets API requests made through this adapter so far."""
+        return self._api_call_count
+
+    def _sync_shared_headers(self, ws) -> None:
+        """Propagate a header change to the process-wide handle cache for this worksheet."""
+        for key, (spreadsheet, worksheet, _, ts) in list(_SPREADSHEET_CACHE.items()):
+            if spreadsheet.id == ws.spreadsheet_id and worksheet.id == ws.id:
+                _SPREADSHEET_CACHE[key] = (spreadsheet, worksheet, self._headers_cache[ws.title], ts)
 
     def _get_target_worksheet(self, table_name: Optional[str] = None):
         """Helper to get the target worksheet."""
@@ -99,7 +256,7 @@ class GoogleSheetsAdapter(BaseDatabaseAdapter):
         if not self.spreadsheet:
             raise ConnectionError("Not connected to Google Sheets.")
         
-        return [ws.title for ws in self.spreadsheet.worksheets()]
+        return [ws.title for ws in await self._call(self.spreadsheet.worksheets)]
 
     async def get_headers(self, table_name: Optional[str] = None) -> List[str]:
         """Return column headers from row 1 of the target worksheet."""
@@ -107,81 +264,272 @@ class GoogleSheetsAdapter(BaseDatabaseAdapter):
         title = ws.title
         
         if title not in self._headers_cache:
-            self._headers_cache[title] = ws.row_values(1)
+            self._headers_cache[title] = await self._call(ws.row_values, 1)
+            self._sync_shared_headers(ws)
         return self._headers_cache[title]
 
-    async def get_all_records(self, table_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Fetch all records as a list of dicts."""
+    def invalidate_headers(self, table_name: Optional[str] = None) -> None:
+        """Mark cached headers dirty so the next get_headers() re-reads row 1."""
         ws = self._get_target_worksheet(table_name)
-        return ws.get_all_records()
+        self._headers_cache.pop(ws.title, None)
 
-    async def get_record_by_key(self, key_column: str, key_value: str, table_name: Optional[str] = None) -> Optional[Dict[str, Any]]:
-        """Find a single record by its primary key column value."""
+    async def get_all_records(self, table_name: Optional[str] = None, force_refresh: bool = False) -> List[Dict[str, Any]]:
+        """Fetch all records as a list of dicts (served from a short-lived snapshot unless force_refresh)."""
+        ws = self._get_target_worksheet(table_name)
+        cached = self._records_cache.get(ws.title)
+        if not force_refresh and cached and time.monotonic() - cached[1] < _RECORDS_CACHE_TTL:
+            return cached[0]
+
+        # Same render option and numeric coercion as every other read path (_row_to_record),
+        # so a row looks identical whether it comes from the snapshot, a filter scan or a key lookup
+        values = await self._call(ws.get_values)
+        if not values:
+            records: List[Dict[str, Any]] = []
+        else:
+            headers = [str(h) for h in values[0]]
+            records = [self._row_to_record(headers, row) for row in values[1:]]
+
+        self._records_cache[ws.title] = (records, time.monotonic())
+        # Column shadows index into the old snapshot; rebuild them against this one
+        self._normalized_cache.pop(ws.title, None)
+        return records
+
+    def _invalidate_records(self, ws) -> None:
+        """Drop the cached snapshot after any write to this worksheet."""
+        self._records_cache.pop(ws.title, None)
+        self._normalized_cache.pop(ws.title, None)
+
+    def _normalized_column(self, title: str, records: List[Dict[str, Any]], column: str) -> List[str]:
+        """Normalise one column of a cached snapshot once and reuse it across filter calls."""
+        shadow = self._normalized_cache.setdefault(title, {})
+        if column not in shadow:
+            shadow[column] = [str(r.get(column, "")).strip().lower() for r in records]
+        return shadow[column]
+
+    @staticmethod
+    def _build_key_index(key_values: List[Any]) -> Dict[str, int]:
+        """Map stripped/lower-cased key values to row numbers (row 1 is the header; first match wins)."""
+        index: Dict[str, int] = {}
+        for row_idx, value in enumerate(key_values[1:], start=2):
+            index.setdefault(str(value).strip().lower(), row_idx)
+        return index
+
+    async def _read_key_index(
+        self, ws, headers: List[str], key_column: str, table_name: Optional[str] = None
+    ) -> Tuple[List[str], Optional[Dict[str, int]], List[Any]]:
+        """Read the header row and key column together (one batchGet) and build a fresh key→row index.
+
+        Returns (current headers, index or None if the key column is gone, raw key column incl. header).
+        The index is stored for the read fast path, which re-checks the row before trusting it.
+        """
+        key_col_idx = headers.index(key_column) + 1
+        key_letter = gspread.utils.rowcol_to_a1(1, key_col_idx).rstrip("0123456789")
+        header_rows, key_rows = await self.batch_read(["1:1", f"{key_letter}:{key_letter}"], table_name)
+        if header_rows and header_rows[0] != headers:
+            headers = header_rows[0]
+            self._headers_cache[ws.title] = headers
+            self._sync_shared_headers(ws)
+            if key_column not in headers:
+                return headers, None, []
+            if headers.index(key_column) + 1 != key_col_idx:
+                # Key column moved since headers were cached; re-read it at its new position
+                key_rows = [[v] for v in await self._call(ws.col_values, headers.index(key_column) + 1)]
+
+        # Case-insensitive, whitespace-tolerant match on the key column only
+        key_values = [cell[0] if cell else "" for cell in key_rows]
+        index = self._build_key_index(key_values)
+        self._key_index[(ws.title, key_column)] = (index, time.monotonic())
+        return headers, index, key_values
+
+    def _invalidate_key_index(self, ws) -> None:
+        """Drop key→row indexes after rows are added to this worksheet."""
+        for cache_key in [k for k in self._key_index if k[0] == ws.title]:
+            del self._key_index[cache_key]
+
+    async def batch_read(self, ranges: List[str], table_name: Optional[str] = None) -> List[List[List[Any]]]:
+        """Read several A1 ranges of the target worksheet with a single values.batchGet call."""
+        ws = self._get_target_worksheet(table_name)
+        qualified = [gspread.utils.absolute_range_name(ws.title, r) for r in ranges]
+        response = await self._call(self.spreadsheet.values_batch_get, qualified)
+        return [vr.get("values", []) for vr in response.get("valueRanges", [])]
+
+    async def get_record_by_key(
+        self,
+        key_column: str,
+        key_value: str,
+        table_name: Optional[str] = None,
+        columns: Optional[Iterable[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Find a single record by its primary key column value.
+
+        Reads only the header row and key column (one batchGet) to locate the row,
+        then that one row, instead of downloading the whole sheet (gspread's find()
+        fetches every cell too). With `columns`, only those fields are decoded and
+        returned.
+        """
+        wanted = frozenset(columns) if columns is not None else None
         print(f"[GOOGLE SHEETS] 🔍 Searching for record where '{key_column}' == '{key_value}' in table '{table_name or 'default'}'...")
-        records = await self.get_all_records(table_name)
-        print(f"[GOOGLE SHEETS] Iterating over {len(records)} total records to find match...")
-        for record in records:
-            if str(record.get(key_column, "")).strip().lower() == str(key_value).strip().lower():
-                print(f"[GOOGLE SHEETS] ✅ SUCCESS: Record matched and found!")
-                return record
-        
-        print(f"[GOOGLE SHEETS] ❌ FAILED: Record '{key_value}' NOT found after checking {len(records)} rows.")
+        ws = self._get_target_worksheet(table_name)
+
+        headers = await self.get_headers(table_name)
+        if key_column not in headers:
+            print(f"[GOOGLE SHEETS] ❌ FAILED: Key column '{key_column}' not in headers.")
+            return None
+
+        # Fast path: row already known from a fresh index → header row + that row in one batchGet
+        target = str(key_value).strip().lower()
+        cached = self._key_index.get((ws.title, key_column))
+        if cached and time.monotonic() - cached[1] < _KEY_INDEX_READ_TTL and target in cached[0]:
+            row_idx = cached[0][target]
+            header_rows, rows = await self.batch_read(["1:1", f"{row_idx}:{row_idx}"], table_name)
+            fresh_headers = header_rows[0] if header_rows else headers
+            row = rows[0] if rows else []
+            key_pos = fresh_headers.index(key_column) if key_column in fresh_headers else -1
+            # Rows can shift under us (inserts/deletes); only trust the row if its key still matches
+            if key_pos >= 0 and key_pos < len(row) and str(row[key_pos]).strip().lower() == target:
+                if fresh_headers != headers:
+                    self._headers_cache[ws.title] = fresh_headers
+                    self._sync_shared_headers(ws)
+                print(f"[GOOGLE SHEETS] ✅ SUCCESS: Record matched at indexed row {row_idx}!")
+                return self._row_to_record(fresh_headers, row, wanted)
+            self._invalidate_key_index(ws)
+
+        # Header row + key column in one request; the fresh header row keeps the cache honest
+        headers, index, key_values = await self._read_key_index(ws, headers, key_column, table_name)
+        if index is None:
+            print(f"[GOOGLE SHEETS] ❌ FAILED: Key column '{key_column}' no longer in headers.")
+            return None
+        row_idx = index.get(target)
+        if row_idx:
+            print(f"[GOOGLE SHEETS] ✅ SUCCESS: Record matched at row {row_idx}!")
+            return self._row_to_record(headers, await self.get_row(row_idx, table_name), wanted)
+
+        print(f"[GOOGLE SHEETS] ❌ FAILED: Record '{key_value}' NOT found after checking {max(len(key_values) - 1, 0)} rows.")
         return None
 
-    async def get_records_by_filter(self, filters: Dict[str, Any], table_name: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Filter records matching all key-value pairs in filters."""
-        records = await self.get_all_records(table_name)
-        results = []
-        for record in records:
-            match = True
+    async def get_row(self, row_number: int, table_name: Optional[str] = None) -> List[Any]:
+        """Fetch a single row's values (one values.get on the row's A1 range)."""
+        ws = self._get_target_worksheet(table_name)
+        return await self._call(ws.row_values, row_number)
+
+    @staticmethod
+    def _row_to_record(headers: List[str], row: List[Any], columns: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+        """Zip a raw row into a dict, matching get_all_records() padding and numeric coercion.
+        With `columns`, only those headers are kept (and numericised)."""
+        row = list(row) + [""] * (len(headers) - len(row))
+        if columns is not None:
+            picked = [(h, v) for h, v in zip(headers, row) if h in columns]
+            return dict(zip([h for h, _ in picked], gspread.utils.numericise_all([v for _, v in picked])))
+        return dict(zip(headers, gspread.utils.numericise_all(row[:len(headers)])))
+
+    async def _refresh_row_count(self, ws) -> int:
+        """Re-read the worksheet's grid size (one metadata call) and update the cached handle."""
+        meta = await self._call(self.spreadsheet.fetch_sheet_metadata, {"fields": "sheets.properties"})
+        for sheet in meta.get("sheets", []):
+            props = sheet.get("properties", {})
+            if props.get("sheetId") == ws.id:
+                ws._properties.update(props)
+                break
+        return ws.row_count
+
+    async def get_records_by_filter(self, filters: Dict[str, Any], table_name: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield records matching all key-value pairs in filters.
+
+        With a fresh snapshot cached, filtering runs against pre-normalised column
+        shadows (each column stripped/lower-cased once). Otherwise rows are read as
+        raw value lists in fixed-size chunks and only matching rows become dicts.
+        """
+        ws = self._get_target_worksheet(table_name)
+
+        # A fresh get_all_records() snapshot is filtered in memory against normalised column shadows
+        cached = self._records_cache.get(ws.title)
+        if cached and time.monotonic() - cached[1] < _RECORDS_CACHE_TTL:
+            records = cached[0]
+            matches = range(len(records))
             for fk, fv in filters.items():
-                if str(record.get(fk, "")).strip().lower() != str(fv).strip().lower():
-                    match = False
-                    break
-            if match:
-                results.append(record)
-        return results
+                column = self._normalized_column(ws.title, records, fk)
+                expected = str(fv).strip().lower()
+                matches = [i for i in matches if column[i] == expected]
+            for i in matches:
+                yield records[i]
+            return
+
+        headers = await self.get_headers(table_name)
+
+        # (column position or None, normalised expected value); missing columns compare as ""
+        predicates = [
+            (headers.index(fk) if fk in headers else None, str(fv).strip().lower())
+            for fk, fv in filters.items()
+        ]
+
+        # The shared handle's row_count can be minutes old; rows appended since would be skipped
+        row_count = await self._refresh_row_count(ws)
+        for start in range(2, row_count + 1, _FILTER_CHUNK_ROWS):
+            end = min(start + _FILTER_CHUNK_ROWS - 1, row_count)
+            for row in await self._call(ws.get_values, f"{start}:{end}"):
+                if all(
+                    (str(row[pos]).strip().lower() if pos is not None and pos < len(row) else "") == expected
+                    for pos, expected in predicates
+                ):
+                    yield self._row_to_record(headers, row)
 
     async def update_record(self, key_column: str, key_value: str, updates: Dict[str, Any], table_name: Optional[str] = None) -> bool:
         """Update a specific employee's fields by locating their row.
-        If a column in updates doesn't exist, it will be auto-created."""
+        If a column in updates doesn't exist, it will be auto-created.
+        Column creation and cell writes go out together in one batchUpdate."""
+        results = await self.update_records(key_column, [(key_value, updates)], table_name)
+        return results[key_value]
+
+    async def update_records(self, key_column: str, updates_by_key: List[Tuple[str, Dict[str, Any]]],
+                             table_name: Optional[str] = None) -> Dict[str, bool]:
+        """Update several employees' rows in one batchUpdate (one write against the quota).
+        Missing columns are created in the same request; returns {key_value: updated}."""
         ws = self._get_target_worksheet(table_name)
 
         headers = await self.get_headers(table_name)
         if key_column not in headers:
             raise ValueError(f"Key column '{key_column}' not found in headers.")
 
-        key_col_index = headers.index(key_column) + 1  # gspread is 1-indexed
-        cell = ws.find(str(key_value), in_column=key_col_index)
-
-        if not cell:
-            return False
-
-        row_number = cell.row
-        
-        # Build cell data for update
-        updates_list = []
-        for col_name, value in updates.items():
-            if col_name not in headers:
-                try:
-                    await self.add_column(col_name, table_name=table_name)
-                    headers = await self.get_headers(table_name)
-                except: continue
-            
-            if col_name in headers:
-                col_index = headers.index(col_name) + 1
-                # Format for update: {range: 'A1', values: [[val]]} for v6 compatibility
-                col_letter = gspread.utils.rowcol_to_a1(row_number, col_index)
-                updates_list.append({
-                    'range': col_letter,
-                    'values': [[value]]
+        # Hashed lookup instead of ws.find(), which downloads and scans every cell. Always
+        # rebuilt for writes: a cached index goes stale as soon as someone sorts or inserts rows.
+        headers, key_index, _ = await self._read_key_index(ws, headers, key_column, table_name)
+        if key_index is None:
+            raise ValueError(f"Key column '{key_column}' not found in headers.")
+        results: Dict[str, bool] = {}
+        rows: List[Tuple[int, Dict[str, Any]]] = []
+        for key_value, updates in updates_by_key:
+            row_number = key_index.get(str(key_value).strip().lower())
+            results[key_value] = bool(row_number)
+            if row_number and updates:
+                rows.append((row_number, updates))
+
+        if not rows:
+            return results
+
+        # New headers (plus grid expansion) first, so data cells can target their column index
+        missing = [c for c in dict.fromkeys(col for _, updates in rows for col in updates) if c not in headers]
+        requests = self._new_column_requests(ws, headers, [(c, []) for c in missing]) if missing else []
+        final_headers = headers + missing
+        col_index = {name: i for i, name in enumerate(final_headers)}
+
+        # One updateCells per run of adjacent columns rather than per cell
+        for row_number, updates in rows:
+            positioned = [(col_index[col_name], value) for col_name, value in updates.items()]
+            for first_col, values in self._contiguous_runs(positioned):
+                requests.append({
+                    "updateCells": {
+                        "start": {"sheetId": ws.id, "rowIndex": row_number - 1, "columnIndex": first_col},
+                        "rows": [{"values": [self._to_extended_value(v) for v in values]}],
+                        "fields": "userEnteredValue",
+                    }
                 })
-        
-        if updates_list:
-            # batch_update is more compatible across gspread versions
-            ws.batch_update(updates_list)
 
-        return True
+        await self._call(self.spreadsheet.batch_update, {"requests": requests}, write=True)
+        self._invalidate_records(ws)
+        if missing:
+            self._commit_new_columns(ws, headers, missing)
+
+        return results
 
     async def create_record(self, data: Dict[str, Any], table_name: Optional[str] = None) -> bool:
         """Create a new record (row) in the Google Sheet."""
@@ -189,15 +537,10 @@ class GoogleSheetsAdapter(BaseDatabaseAdapter):
 
         headers = await self.get_headers(table_name)
         
-        # Ensure all columns in the new record exist in the sheet
-        headers_updated = False
-        for col_name in data.keys():
-            if col_name not in headers:
-                await self.add_column(col_name, table_name=table_name)
-                headers_updated = True
-        
-        if headers_updated:
-            headers = await self.get_headers(table_name)
+        # Ensure all columns in the new record exist in the sheet (one batched request)
+        missing = [c for c in data.keys() if c not in headers]
+        if missing:
+            headers = headers + await self.add_columns(missing, table_name=table_name)
 
         # Construct the row values in order
         new_row = []
@@ -205,11 +548,85 @@ class GoogleSheetsAdapter(BaseDatabaseAdapter):
             new_row.append(data.get(h, ""))
 
         # Append to the bottom
-        ws.append_row(new_row)
+        await self._call(ws.append_row, new_row, write=True)
+        self._invalidate_records(ws)
+        self._invalidate_key_index(ws)
         return True
 
+    @staticmethod
+    def _contiguous_runs(positioned: List[Tuple[int, Any]]) -> List[Tuple[int, List[Any]]]:
+        """Group (index, value) pairs into runs of consecutive indices: [(first_index, [values...])]."""
+        runs: List[Tuple[int, List[Any]]] = []
+        for idx, value in sorted(positioned, key=lambda p: p[0]):
+            if runs and runs[-1][0] + len(runs[-1][1]) == idx:
+                runs[-1][1].append(value)
+            elif runs and runs[-1][0] + len(runs[-1][1]) > idx:
+                runs[-1][1][idx - runs[-1][0]] = value  # duplicate index: last write wins
+            else:
+                runs.append((idx, [value]))
+        return runs
+
+    @staticmethod
+    def _to_extended_value(value: Any) -> Dict[str, Any]:
+        """Convert a Python value to a Sheets ExtendedValue with RAW semantics.
+        Strings stay strings: no formula or number parsing of user-supplied text
+        (keeps '=…' inert and leading zeros in IDs/phone numbers)."""
+        if value is None or value == "":
+            return {}
+        if isinstance(value, bool):
+            return {"userEnteredValue": {"boolValue": value}}
+        if isinstance(value, (int, float)) and math.isfinite(value):
+            return {"userEnteredValue": {"numberValue": value}}
+        return {"userEnteredValue": {"stringValue": str(value)}}
+
+    def _new_column_requests(self, ws, headers: List[str], columns: List[Tuple[str, List[Any]]]) -> List[Dict[str, Any]]:
+        """Build batchUpdate requests that expand the grid and write headers + default values."""
+        requests = []
+
+        # Expand grid horizontally if needed
+        overflow = len(headers) + len(columns) - ws.col_count
+        if overflow > 0:
+            requests.append({"appendDimension": {"sheetId": ws.id, "dimension": "COLUMNS", "length": overflow}})
+
+        height = 1 + max(len(defaults) for _, defaults in columns)
+        rows = []
+        for r in range(height):
+            cells = []
+            for name, defaults in columns:
+                value = name if r == 0 else (defaults[r - 1] if r - 1 < len(defaults) else None)
+                cells.append(self._to_extended_value(value))
+            rows.append({"values": cells})
+
+        requests.append({
+            "updateCells": {
+                "start": {"sheetId": ws.id, "rowIndex": 0, "columnIndex": len(headers)},
+                "rows": rows,
+                "fields": "userEnteredValue",
+            }
+        })
+        return requests
+
+    def _commit_new_columns(self, ws, headers: List[str], names: List[str]) -> List[str]:
+        """Record columns written by a successful batchUpdate in the local caches; returns the new headers."""
+        # Keep the local grid size in step so later col_count checks stay accurate
+        overflow = len(headers) + len(names) - ws.col_count
+        if overflow > 0:
+            ws._properties["gridProperties"]["columnCount"] = ws.col_count + overflow
+
+        new_headers = headers + names
+        self._headers_cache[ws.title] = new_headers
+        self._sync_shared_headers(ws)
+        return new_headers
+
+    async def _write_new_columns(self, ws, headers: List[str], columns: List[Tuple[str, List[Any]]]) -> None:
+        """Expand the grid and write headers + default values in a single batchUpdate request."""
+        requests = self._new_column_requests(ws, headers, columns)
+        await self._call(self.spreadsheet.batch_update, {"requests": requests}, write=True)
+        self._invalidate_records(ws)
+        self._commit_new_columns(ws, headers, [name for name, _ in columns])
+
     async def add_column(self, column_name: str, default_values: Optional[List[Any]] = None, table_name: Optional[str] = None) -> bool:
-        """Add a new column at the end of the sheet."""
+        """Add a new column at the end of the sheet (grid expansion, header and defaults in one request)."""
         ws = self._get_target_worksheet(table_name)
 
         headers = await self.get_headers(table_name)
@@ -218,24 +635,20 @@ class GoogleSheetsAdapter(BaseDatabaseAdapter):
         if column_name in headers:
             return True  # Already exists, no-op
 
-        new_col_index = len(headers) + 1
-        
-        # Expand grid horizontally if needed
-        if new_col_index > ws.col_count:
-            ws.add_cols(1)
-            
-        cells_to_update = [gspread.Cell(row=1, col=new_col_index, value=column_name)]
+        await self._write_new_columns(ws, headers, [(column_name, default_values or [])])
+        return True
 
-        # Write default values if provided
-        if default_values:
-            for i, val in enumerate(default_values):
-                cells_to_update.append(gspread.Cell(row=i + 2, col=new_col_index, value=val))
+    async def add_columns(self, column_names: List[str], table_name: Optional[str] = None) -> List[str]:
+        """Append several header columns with one batchUpdate request."""
+        ws = self._get_target_worksheet(table_name)
 
-        ws.update_cells(cells_to_update)
+        headers = await self.get_headers(table_name)
+        to_create = [c for c in dict.fromkeys(column_names) if c and c not in headers]
+        if not to_create:
+            return []
 
-        # Refresh headers cache
-        self._headers_cache[ws.title] = ws.row_values(1)
-        return True
+        await self._write_new_columns(ws, headers, [(name, []) for name in to_create])
+        return to_create
 
     async def update_column_values(self, column_name: str, key_column: str,
                                     key_value_map: Dict[str, Any], table_name: Optional[str] = None) -> bool:
@@ -248,21 +661,31 @@ class GoogleSheetsAdapter(BaseDatabaseAdapter):
         if key_column not in headers:
             raise ValueError(f"Key column '{key_column}' not found.")
 
-        key_col_idx = headers.index(key_column) + 1
+        # Fresh index and headers for the write (see update_records)
+        headers, index, key_values = await self._read_key_index(ws, headers, key_column, table_name)
+        if index is None or column_name not in headers:
+            raise ValueError(f"Column '{column_name}' or key column '{key_column}' no longer in headers.")
         target_col_idx = headers.index(column_name) + 1
 
-        all_values = ws.col_values(key_col_idx)
-        cells_to_update = []
-
-        for row_idx, cell_value in enumerate(all_values):
-            if row_idx == 0:
-                continue  # Skip header
+        # Exact (whitespace-stripped, case-sensitive) key match, and every matching row is written
+        positioned = []
+        for row_number, cell_value in enumerate(key_values[1:], start=2):
             clean_val = str(cell_value).strip()
             if clean_val in key_value_map:
-                cells_to_update.append(gspread.Cell(row=row_idx + 1, col=target_col_idx, value=key_value_map[clean_val]))
-
-        if cells_to_update:
-            ws.update_cells(cells_to_update)
+                positioned.append((row_number, key_value_map[clean_val]))
+
+        # Contiguous rows collapse into one rectangular range each (typically a single range)
+        data = [
+            {
+                "range": f"{gspread.utils.rowcol_to_a1(first_row, target_col_idx)}:"
+                         f"{gspread.utils.rowcol_to_a1(first_row + len(values) - 1, target_col_idx)}",
+                "values": [[v] for v in values],
+            }
+            for first_row, values in self._contiguous_runs(positioned)
+        ]
+        if data:
+            await self._call(ws.batch_update, data, value_input_option=gspread.utils.ValueInputOption.raw, write=True)
+            self._invalidate_records(ws)
 
         return True
 
@@ -275,5 +698,5 @@ class GoogleSheetsAdapter(BaseDatabaseAdapter):
             raise ValueError(f"Column '{column_name}' not found.")
 
         col_idx = headers.index(column_name) + 1
-        all_values = ws.col_values(col_idx)
+        all_values = await self._call(ws.col_values, col_idx)
         return all_values[1:]  # Exclude header
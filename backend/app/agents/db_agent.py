@@ -5,24 +5,72 @@ external database (Google Sheets, etc.)
 
 This agent is called as a SUB-AGENT by the HR Conversational Agent.
 It has its own LangGraph pipeline:
-  1. connect_and_read_schema → Connects to the sheet, reads headers
-  2. read_employee_data → Fetches the employee's current row
-  3. plan_updates → AI generates the exact update plan based on schema + context
-  4. execute_updates → Writes to the sheet
-  5. verify_updates → Re-reads the row to confirm changes were applied
+  1. connect_and_read → Reads headers and the employee's current row (concurrently)
+  2. plan_updates → AI generates the exact update plan based on schema + context
+  3. execute_updates → Writes to the sheet
+  4. verify_updates → Re-reads the row to confirm changes were applied
 """
 
-import json
-import re
-from typing import Any, Dict, List, Optional, TypedDict
+import asyncio
+import hashlib
+import logging
+import orjson
+from cachetools import TTLCache
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Optional, TypedDict
 from langgraph.graph import StateGraph, END
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import HumanMessage, SystemMessage
 from app.config import settings
-from app.adapters.adapter_factory import get_adapter
+from app.adapters.adapter_factory import get_cached_adapter
+from app.utils.http_client import get_http_client
 from app.models.models import DatabaseType
 
 
+logger = logging.getLogger("botivate_api.db_agent")
+
+
+def _dumps(obj: Any) -> str:
+    """Compact orjson encoding; like json.dumps(default=str) it tolerates non-str keys and odd types."""
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _strip_json_fences(raw: str) -> str:
+    """Extract the JSON object from a model reply, tolerating ```json fences or surrounding prose."""
+    clean = raw
+    if clean[:1] != "{":
+        # Fence stripping only when the reply doesn't already open with the object
+        clean = clean.removeprefix("```json").removeprefix("```").removesuffix("```").strip()
+    # Always cut to the outermost braces: '{...}\nNote: ...' must still parse
+    start, end = clean.find("{"), clean.rfind("}")
+    if start != -1 and end > start:
+        clean = clean[start:end + 1]
+    return clean
+
+
+# Sheet headers per "spreadsheet_id:sheet_name". Schemas change rarely, so runs
+# skip the header read; column creation extends the entry in place of a re-read.
+_HEADERS_CACHE: TTLCache = TTLCache(maxsize=256, ttl=600)
+
+
+def _headers_cache_key(connection_config: Dict[str, Any]) -> str:
+    return f"{connection_config.get('spreadsheet_id', '')}:{connection_config.get('sheet_name', '')}"
+
+
+async def _reload_headers(state: "DBAgentState") -> List[str]:
+    """Drop this sheet's cached headers and read them again through the run's adapter."""
+    adapter = state["adapter"]
+    cache_key = _headers_cache_key(state["connection_config"])
+    _HEADERS_CACHE.pop(cache_key, None)
+    invalidate = getattr(adapter, "invalidate_headers", None)
+    if invalidate:
+        invalidate()
+    headers = await adapter.get_headers()
+    _HEADERS_CACHE[cache_key] = headers
+    return headers
+
+
 # ── Agent State ──────────────────────────────────────────
 
 class DBAgentState(TypedDict):
@@ -33,6 +81,7 @@ class DBAgentState(TypedDict):
     employee_id: str
     action: str              # "leave_request_applied", "leave_request_approved", etc.
     context: Dict[str, Any]  # Rich context: dates, reason, decided_by, etc.
+    adapter: Any             # Connected adapter, built once per run and shared by all nodes
     
     # Working state
     headers: List[str]
@@ -51,115 +100,91 @@ class DBAgentState(TypedDict):
 
 # ── LLM ──────────────────────────────────────────────────
 
+@lru_cache(maxsize=1)
 def get_db_llm() -> ChatOpenAI:
+    """Process-wide LLM client on the shared httpx pool, so connections to the API stay warm."""
     return ChatOpenAI(
         model=settings.openai_model,
         api_key=settings.openai_api_key,
         temperature=0,
+        http_async_client=get_http_client(),
+        # Routes calls sharing the static rules prefix to the same prompt cache
+        extra_body={"prompt_cache_key": "db_agent_plan_v1"},
     )
 
 
-# ── Node 1: Connect & Read Schema ──────────────────────
+# ── Node 1: Read Schema + Employee Row ──────────────────
 
-async def connect_and_read_schema(state: DBAgentState) -> DBAgentState:
-    """Connect to the database and read current headers/schema."""
-    try:
-        adapter = await get_adapter(
-            DatabaseType(state["db_type"]), 
-            state["connection_config"]
-        )
-        headers = await adapter.get_headers()
-        primary_key = state["schema_map"].get("primary_key", "")
-        
-        if not primary_key:
-            state["error"] = "No primary_key in schema_map. Cannot identify employee row."
-            state["success"] = False
-            return state
-        
-        if primary_key not in headers:
-            state["error"] = f"Primary key column '{primary_key}' not found in sheet headers: {headers}"
-            state["success"] = False
-            return state
-        
-        state["headers"] = headers
-        state["primary_key"] = primary_key
-        print(f"[DB AGENT] ✅ Schema read: {len(headers)} columns, PK='{primary_key}'")
-        
-    except Exception as e:
-        state["error"] = f"Connection failed: {str(e)}"
+async def connect_and_read(state: DBAgentState) -> DBAgentState:
+    """Read headers and the employee's current row concurrently through the run's adapter."""
+    primary_key = state["schema_map"].get("primary_key", "")
+    if not primary_key:
+        state["error"] = "No primary_key in schema_map. Cannot identify employee row."
         state["success"] = False
-        print(f"[DB AGENT] ❌ Connection error: {e}")
-    
-    return state
+        return state
 
+    adapter = state["adapter"]
+    cache_key = _headers_cache_key(state["connection_config"])
+    cached_headers = _HEADERS_CACHE.get(cache_key)
 
-# ── Node 2: Read Employee's Current Data ────────────────
+    async def _headers() -> List[str]:
+        if cached_headers is not None:
+            return cached_headers
+        return await adapter.get_headers()
 
-async def read_employee_data(state: DBAgentState) -> DBAgentState:
-    """Fetch the employee's current row from the sheet."""
-    if state.get("error"):
-        return state  # Skip if previous node failed
-    
     try:
-        adapter = await get_adapter(
-            DatabaseType(state["db_type"]),
-            state["connection_config"]
+        # get_record_by_key already matches case-insensitively, so no full-sheet fallback scan
+        headers, record = await asyncio.gather(
+            _headers(),
+            adapter.get_record_by_key(primary_key, state["employee_id"]),
         )
-        record = await adapter.get_record_by_key(state["primary_key"], state["employee_id"])
-        
-        if not record:
-            # Fallback search
-            all_records = await adapter.get_all_records()
-            for rec in all_records:
-                rec_val = str(rec.get(state["primary_key"], "")).strip().lower()
-                if rec_val == str(state["employee_id"]).strip().lower():
-                    record = rec
-                    break
-
-        if not record:
-            state["error"] = f"Employee '{state['employee_id']}' not found in the sheet."
-            state["success"] = False
-            return state
-        
-        state["employee_data"] = record
-        print(f"[DB AGENT] ✅ Employee data read: {state['employee_id']} ({len(record)} fields)")
-        
     except Exception as e:
-        state["error"] = f"Read failed: {str(e)}"
+        state["error"] = f"Read failed: {str(e) or type(e).__name__}"
         state["success"] = False
-        print(f"[DB AGENT] ❌ Read error: {e}")
-    
-    return state
+        logger.error(f"[DB AGENT] ❌ Read error: {e!r}")
+        return state
 
+    if primary_key not in headers and cached_headers is not None:
+        # Cached header list may predate a sheet edit: re-read once before failing
+        try:
+            headers = await _reload_headers(state)
+            cached_headers = None
+        except Exception as e:
+            logger.warning(f"[DB AGENT] ⚠️ Header re-read failed: {e!r}")
 
-# ── Node 3: Plan Updates (AI generates the CRUD) ────────
+    if primary_key not in headers:
+        state["error"] = f"Primary key column '{primary_key}' not found in sheet headers: {headers}"
+        state["success"] = False
+        return state
 
-async def plan_updates(state: DBAgentState) -> DBAgentState:
-    """AI analyzes the schema, current data, and action context to generate the exact update plan."""
-    if state.get("error"):
+    state["headers"] = headers
+    state["primary_key"] = primary_key
+    if cached_headers is not None:
+        logger.info(f"[DB AGENT] ♻️ Schema reused: {len(headers)} columns, PK='{primary_key}'")
+    else:
+        _HEADERS_CACHE[cache_key] = headers
+        logger.info(f"[DB AGENT] ✅ Schema read: {len(headers)} columns, PK='{primary_key}'")
+
+    if not record:
+        state["error"] = f"Employee '{state['employee_id']}' not found in the sheet."
+        state["success"] = False
         return state
-    
-    try:
-        if not settings.openai_api_key or settings.openai_api_key == "your-openai-api-key-here":
-            # Fallback without AI
-            state["update_plan"] = _fallback_plan(state["headers"], state["action"], state["context"])
-            return state
-        
-        llm = get_db_llm()
-        
-        prompt = f"""You are an expert HR database administrator. Your task is to generate the EXACT updates to write to an employee's spreadsheet row.
 
-=== CURRENT SHEET COLUMNS ===
-{json.dumps(state['headers'])}
+    state["employee_data"] = record
+    logger.info(f"[DB AGENT] ✅ Employee data read: {state['employee_id']} ({len(record)} fields)")
+    return state
 
-=== EMPLOYEE'S CURRENT ROW DATA ===
-{json.dumps(state['employee_data'], default=str, indent=2)}
 
-=== ACTION THAT OCCURRED ===
-"{state['action']}"
+# ── Node 2: Plan Updates (AI generates the CRUD) ────────
 
-=== ACTION DETAILS ===
-{json.dumps(state['context'], default=str, indent=2)}
+# LLM plans keyed by a hash of (columns, action, context, row subset). Lookups and
+# inserts never straddle an await, so no lock is needed on the event loop.
+_PLAN_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=settings.plan_cache_ttl)
+
+# Static instructions sent as the system message. Keep this free of per-run
+# values so every request shares the same token prefix and hits the cache.
+PLAN_UPDATES_RULES = """You are an expert HR database administrator. Your task is to generate the EXACT updates to write to an employee's spreadsheet row.
+The user message gives the PRIMARY KEY COLUMN, CURRENT SHEET COLUMNS, EMPLOYEE'S CURRENT ROW DATA, ACTION THAT OCCURRED and ACTION DETAILS.
 
 LEAVE CALCULATION RULES (STRICT CONSISTENCY):
 1. If action is "leave_request_approved":
@@ -181,23 +206,109 @@ GENERAL RULES:
 1. USE EXACT COLUMN NAMES bit-for-bit from CURRENT SHEET COLUMNS.
 2. For dates (Last Leave From/To), use the format from existing row data (likely DD/MM/YYYY).
 3. Return final NUMBERS, not strings of math (e.g. 15, not "15 days").
-4. Never update the primary key column ("{state['primary_key']}").
+4. Never update the PRIMARY KEY COLUMN.
 
 === RESPONSE FORMAT ===
 Return ONLY valid JSON:
-{{
-  "updates": {{
+{
+  "updates": {
     "Exact Column Name": "new value or number"
-  }},
+  },
   "new_columns": []
-}}
+}
 No explanations. Only JSON."""
 
-        resp = await llm.ainvoke([HumanMessage(content=prompt)])
+# Column-name tokens relevant to each request family, used to trim the prompt. Matched as
+# substrings, so short words like "to"/"from" are left out (they hit "Total", "Location", ...);
+# "Upcoming Leave From/To" and "Last Leave To" are reached via "upcoming"/"last"/"leave".
+_REQUEST_TOKENS = frozenset({"status", "reason", "date", "last", "upcoming"})
+_ACTION_TOKENS: Dict[str, frozenset] = {
+    "leave": _REQUEST_TOKENS | {
+        "leave", "balance", "taken", "remaining", "available", "entitlement", "carry",
+    },
+    "grievance": _REQUEST_TOKENS | {"grievance", "complaint"},
+    "resignation": _REQUEST_TOKENS | {"resignation", "notice", "exit", "relieving"},
+}
+
+
+def _action_keywords(action: str) -> Optional[frozenset]:
+    """Tokens for columns an action may update; None means send every column."""
+    action_type = action.split("_")[0]
+    tokens = _ACTION_TOKENS.get(action_type)
+    if tokens:
+        return tokens
+    if action.endswith(("_applied", "_approved", "_rejected")):
+        return _REQUEST_TOKENS | {action_type}
+    return None  # e.g. "data_update" can target any column
+
+
+async def plan_updates(state: DBAgentState) -> DBAgentState:
+    """AI analyzes the schema, current data, and action context to generate the exact update plan."""
+    if state.get("error"):
+        return state
+    
+    # Mechanical transitions are planned locally; the LLM is only needed for anything else
+    template = ACTION_TEMPLATES.get(state["action"].rsplit("_", 1)[-1])
+    plan = template(state["headers"], state["action"], state["context"], state["employee_data"]) if template else None
+    if plan:
+        state["update_plan"] = plan
+        logger.info(f"[DB AGENT] ⚡ Template plan for '{state['action']}': {len(plan['updates'])} updates (LLM skipped)")
+        return state
+
+    try:
+        if not settings.openai_api_key or settings.openai_api_key == "your-openai-api-key-here":
+            # Fallback without AI
+            state["update_plan"] = _fallback_plan(state["headers"], state["action"], state["context"])
+            return state
+        
+        llm = get_db_llm()
+        
+        # Only send columns the action can plausibly touch (full row for free-form actions)
+        keywords = _action_keywords(state["action"])
+        if keywords:
+            columns = [
+                h for h, low in _lower_headers(tuple(state["headers"]))
+                if h == state["primary_key"] or any(tok in low for tok in keywords)
+            ]
+        else:
+            columns = state["headers"]
+        row_data = {h: state["employee_data"].get(h, "") for h in columns}
+        
+        # Identical inputs at temperature 0 give the same plan, so serve repeats from memory
+        cache_key = hashlib.blake2b(
+            orjson.dumps(
+                {"h": columns, "a": state["action"], "ctx": state["context"], "row": row_data},
+                default=str, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+            ),
+            digest_size=16,
+        ).hexdigest()
+        cached_plan = _PLAN_CACHE.get(cache_key)
+        if cached_plan is not None:
+            state["update_plan"] = {"updates": dict(cached_plan["updates"]), "new_columns": list(cached_plan["new_columns"])}
+            logger.info(f"[DB AGENT] ♻️ Plan cache hit: {len(cached_plan['updates'])} updates (LLM skipped)")
+            return state
+
+        # Static rules first (byte-identical across calls → provider prefix cache), per-run data last
+        prompt = f"""=== PRIMARY KEY COLUMN (never update) ===
+"{state['primary_key']}"
+
+=== CURRENT SHEET COLUMNS ===
+{_dumps(columns)}
+
+=== EMPLOYEE'S CURRENT ROW DATA ===
+{_dumps(row_data)}
+
+=== ACTION THAT OCCURRED ===
+"{state['action']}"
+
+=== ACTION DETAILS ===
+{_dumps(state['context'])}"""
+
+        resp = await llm.ainvoke([SystemMessage(content=PLAN_UPDATES_RULES), HumanMessage(content=prompt)])
         raw = resp.content.strip()
-        clean = re.sub(r"```json\s*|```\s*", "", raw).strip()
+        clean = _strip_json_fences(raw)
         
-        plan = json.loads(clean)
+        plan = orjson.loads(clean)
         
         # Safety validations
         if not isinstance(plan, dict):
@@ -210,20 +321,22 @@ No explanations. Only JSON."""
         plan["updates"].pop(state["primary_key"], None)
         
         state["update_plan"] = plan
-        print(f"[DB AGENT] ✅ Update plan generated: {len(plan['updates'])} updates, {len(plan['new_columns'])} new columns")
-        print(f"[DB AGENT] Plan details: {json.dumps(plan, default=str)}")
+        _PLAN_CACHE[cache_key] = {"updates": dict(plan["updates"]), "new_columns": list(plan["new_columns"])}
+        logger.info(f"[DB AGENT] ✅ Update plan generated: {len(plan['updates'])} updates, {len(plan['new_columns'])} new columns")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[DB AGENT] Plan details: %s", _dumps(plan))
         
-    except json.JSONDecodeError as je:
-        print(f"[DB AGENT] ⚠️ AI JSON parse error: {je}, using fallback")
+    except orjson.JSONDecodeError as je:
+        logger.warning(f"[DB AGENT] ⚠️ AI JSON parse error: {je}, using fallback")
         state["update_plan"] = _fallback_plan(state["headers"], state["action"], state["context"])
     except Exception as e:
-        print(f"[DB AGENT] ⚠️ Plan error: {e}, using fallback")
+        logger.warning(f"[DB AGENT] ⚠️ Plan error: {e}, using fallback")
         state["update_plan"] = _fallback_plan(state["headers"], state["action"], state["context"])
     
     return state
 
 
-# ── Node 4: Execute Updates ──────────────────────────────
+# ── Node 3: Execute Updates ──────────────────────────────
 
 async def execute_updates(state: DBAgentState) -> DBAgentState:
     """Execute the AI-generated update plan on the actual sheet."""
@@ -238,61 +351,53 @@ async def execute_updates(state: DBAgentState) -> DBAgentState:
         state["success"] = True
         state["updates_applied"] = {}
         state["new_columns_created"] = []
-        print("[DB AGENT] ℹ️ No updates needed")
+        logger.info("[DB AGENT] ℹ️ No updates needed")
         return state
     
     try:
-        adapter = await get_adapter(
-            DatabaseType(state["db_type"]),
-            state["connection_config"]
-        )
+        adapter = state["adapter"]
+
+        # A planned column missing from the (possibly cached) headers may already exist:
+        # re-read once so it is written in place rather than reported as created
+        if any(c and c not in state["headers"] for c in [*new_columns, *updates]):
+            state["headers"] = await _reload_headers(state)
         
-        # Step 1: Create new columns first
-        created_cols = []
-        for col_name in new_columns:
-            if col_name and col_name not in state["headers"]:
-                try:
-                    await adapter.add_column(col_name)
-                    created_cols.append(col_name)
-                    print(f"[DB AGENT] ✅ Created column: '{col_name}'")
-                except Exception as ce:
-                    print(f"[DB AGENT] ⚠️ Failed to create column '{col_name}': {ce}")
+        # New columns ride along with the cell writes: update_record creates any missing
+        # header in the same batchUpdate, so planned-but-empty columns are written as ""
+        cols_to_create = [c for c in dict.fromkeys(new_columns) if c and c not in state["headers"]]
+        created_cols = [c for c in dict.fromkeys([*cols_to_create, *updates]) if c not in state["headers"]]
+        writes = {**{c: "" for c in cols_to_create if c not in updates}, **updates}
         
-        # Refresh headers after creating columns
-        if created_cols:
-            state["headers"] = await adapter.get_headers()
+        success = await adapter.update_record(
+            state["primary_key"], 
+            state["employee_id"], 
+            writes
+        )
         
-        # Step 2: Execute the updates
-        if updates:
-            success = await adapter.update_record(
-                state["primary_key"], 
-                state["employee_id"], 
-                updates
-            )
-            
-            if success:
-                state["success"] = True
-                state["updates_applied"] = updates
-                state["new_columns_created"] = created_cols
-                print(f"[DB AGENT] ✅ Sheet UPDATED for {state['employee_id']}: {updates}")
-            else:
-                state["error"] = f"update_record returned False for employee {state['employee_id']}"
-                state["success"] = False
-                print(f"[DB AGENT] ❌ update_record returned False")
-        else:
+        if success:
+            if created_cols:
+                # Headers are now known locally; extend the shared cache instead of re-reading
+                state["headers"] = state["headers"] + created_cols
+                _HEADERS_CACHE[_headers_cache_key(state["connection_config"])] = state["headers"]
+                logger.info(f"[DB AGENT] ✅ Created columns: {created_cols}")
             state["success"] = True
-            state["updates_applied"] = {}
+            state["updates_applied"] = updates
             state["new_columns_created"] = created_cols
+            logger.info(f"[DB AGENT] ✅ Sheet UPDATED for {state['employee_id']}: {updates}")
+        else:
+            state["error"] = f"update_record returned False for employee {state['employee_id']}"
+            state["success"] = False
+            logger.error(f"[DB AGENT] ❌ update_record returned False")
             
     except Exception as e:
         state["error"] = f"Execute failed: {str(e)}"
         state["success"] = False
-        print(f"[DB AGENT] ❌ Execute error: {e}")
+        logger.error(f"[DB AGENT] ❌ Execute error: {e}")
     
     return state
 
 
-# ── Node 5: Verify Updates ──────────────────────────────
+# ── Node 4: Verify Updates ──────────────────────────────
 
 async def verify_updates(state: DBAgentState) -> DBAgentState:
     """Re-read the employee's row to verify the updates were applied."""
@@ -302,55 +407,83 @@ async def verify_updates(state: DBAgentState) -> DBAgentState:
         if retry < 2 and state.get("update_plan"):
             state["retry_count"] = retry + 1
             state["error"] = None  # Clear error for retry
-            print(f"[DB AGENT] 🔄 Retrying... attempt {retry + 1}")
+            logger.info(f"[DB AGENT] 🔄 Retrying... attempt {retry + 1}")
             return state
         return state
     
+    state["verification"] = await _verify_row(
+        state["adapter"], state["primary_key"], state["employee_id"], state.get("updates_applied", {})
+    )
+    return state
+
+
+def _norm(value: Any) -> Any:
+    """Normalise a cell value so 20, "20" and "20.00" compare equal."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    text = str(value).strip() if value is not None else ""
     try:
-        adapter = await get_adapter(
-            DatabaseType(state["db_type"]),
-            state["connection_config"]
-        )
-        
-        updated_record = await adapter.get_record_by_key(
-            state["primary_key"], 
-            state["employee_id"]
-        )
+        return float(text)
+    except ValueError:
+        return text.casefold()
+
+
+async def _verify_row(adapter: Any, primary_key: str, employee_id: str, updates_applied: Dict[str, Any]) -> Dict[str, Any]:
+    """Re-read one row and compare it with the values just written."""
+    if not updates_applied:
+        return {"verified_count": 0, "failed_count": 0, "verified_fields": {}, "failed_fields": {}}
+    try:
+        updated_record = await adapter.get_record_by_key(primary_key, employee_id)
         
-        if updated_record:
-            # Verify each update was applied
-            verified = {}
-            failed = {}
-            for col, expected_val in state.get("updates_applied", {}).items():
-                actual_val = updated_record.get(col)
-                if str(actual_val).strip() == str(expected_val).strip():
-                    verified[col] = actual_val
-                else:
-                    failed[col] = {"expected": expected_val, "actual": actual_val}
-            
-            state["verification"] = {
-                "verified_count": len(verified),
-                "failed_count": len(failed),
-                "verified_fields": verified,
-                "failed_fields": failed,
-            }
-            
-            if failed:
-                print(f"[DB AGENT] ⚠️ Verification: {len(verified)} OK, {len(failed)} MISMATCH: {failed}")
+        if not updated_record:
+            return {"error": "Could not re-read record for verification"}
+
+        # Verify each update was applied
+        verified = {}
+        failed = {}
+        for col, expected_val in updates_applied.items():
+            actual_val = updated_record.get(col)
+            if _norm(actual_val) == _norm(expected_val):
+                verified[col] = actual_val
             else:
-                print(f"[DB AGENT] ✅ Verification: ALL {len(verified)} fields confirmed!")
+                failed[col] = {"expected": expected_val, "actual": actual_val}
+        
+        if failed:
+            logger.warning(f"[DB AGENT] ⚠️ Verification ({employee_id}): {len(verified)} OK, {len(failed)} MISMATCH: {failed}")
         else:
-            state["verification"] = {"error": "Could not re-read record for verification"}
+            logger.info(f"[DB AGENT] ✅ Verification ({employee_id}): ALL {len(verified)} fields confirmed!")
+
+        return {
+            "verified_count": len(verified),
+            "failed_count": len(failed),
+            "verified_fields": verified,
+            "failed_fields": failed,
+        }
             
     except Exception as e:
-        print(f"[DB AGENT] ⚠️ Verification error (non-critical): {e}")
-        state["verification"] = {"error": str(e)}
-    
-    return state
+        logger.warning(f"[DB AGENT] ⚠️ Verification error (non-critical): {e}")
+        return {"error": str(e)}
+
+
+# Successful writes are verified off the request path unless strict mode is on
+_VERIFY_SEMAPHORE = asyncio.Semaphore(16)
+_VERIFY_TASKS: set = set()  # strong refs so pending tasks aren't garbage-collected
+
+
+async def _background_verify(adapter: Any, primary_key: str, employee_id: str, updates_applied: Dict[str, Any]) -> None:
+    async with _VERIFY_SEMAPHORE:
+        await _verify_row(adapter, primary_key, employee_id, updates_applied)
 
 
 # ── Routing Logic ────────────────────────────────────────
 
+def after_execute(state: DBAgentState) -> str:
+    """Successful writes finish here (verification runs in the background) unless strict verify is on."""
+    if state.get("success") and not settings.db_agent_strict_verify:
+        return "done"
+    return "verify"
+
+
 def should_retry(state: DBAgentState) -> str:
     """After verify, decide if we need to retry or finish."""
     if not state.get("success") and state.get("retry_count", 0) < 2:
@@ -376,17 +509,19 @@ def _fallback_plan(headers: List[str], action: str, context: dict) -> dict:
         "rejected": "Rejected",
     }.get(action_status, "Pending")
     
-    # Find matching columns
-    for h in headers:
-        h_lower = h.lower()
-        if action_type in h_lower and "status" in h_lower:
-            updates[h] = status_value
-        if action_type in h_lower and "reason" in h_lower and context.get("reason"):
-            updates[h] = context["reason"]
-        if "upcoming" in h_lower and "from" in h_lower and context.get("start_date"):
-            updates[h] = context["start_date"]
-        if "upcoming" in h_lower and "to" in h_lower and context.get("end_date"):
-            updates[h] = context["end_date"]
+    # Find matching columns (shared substring tests are hoisted so misses exit early)
+    reason, start_date, end_date = context.get("reason"), context.get("start_date"), context.get("end_date")
+    for h, h_lower in _lower_headers(tuple(headers)):
+        if action_type in h_lower:
+            if "status" in h_lower:
+                updates[h] = status_value
+            if reason and "reason" in h_lower:
+                updates[h] = reason
+        if "upcoming" in h_lower:
+            if start_date and "from" in h_lower:
+                updates[h] = start_date
+            if end_date and "to" in h_lower:
+                updates[h] = end_date
     
     # If no status column found, create one
     if not any("status" in k.lower() for k in updates):
@@ -397,6 +532,146 @@ def _fallback_plan(headers: List[str], action: str, context: dict) -> dict:
     return {"updates": updates, "new_columns": new_columns}
 
 
+# ── Deterministic Action Templates ──────────────────────
+# Mirror the applied / approved (leave balances) / rejected rules from the plan_updates prompt. Each
+# planner returns None when the sheet lacks the columns it needs, in which case
+# the LLM (or _fallback_plan) takes over.
+
+@lru_cache(maxsize=64)
+def _lower_headers(headers: tuple) -> tuple:
+    """(header, header.lower()) pairs, computed once per distinct header list."""
+    return tuple((h, h.lower()) for h in headers)
+
+
+def _find_status_column(headers: List[str], action_type: str) -> Optional[str]:
+    for h, h_lower in _lower_headers(tuple(headers)):
+        if action_type in h_lower and "status" in h_lower:
+            return h
+    return None
+
+
+def _detail_updates(headers: List[str], action_type: str, context: dict) -> Dict[str, Any]:
+    """Reason and upcoming-date columns filled from context."""
+    reason, start_date, end_date = context.get("reason"), context.get("start_date"), context.get("end_date")
+    updates = {}
+    for h, h_lower in _lower_headers(tuple(headers)):
+        if reason and action_type in h_lower and "reason" in h_lower:
+            updates[h] = reason
+        if "upcoming" in h_lower:
+            if start_date and "from" in h_lower:
+                updates[h] = start_date
+            if end_date and "to" in h_lower:
+                updates[h] = end_date
+    return updates
+
+
+def _plan_applied(headers: List[str], action: str, context: dict, row: dict) -> Optional[dict]:
+    """Status → Pending, plus reason and upcoming dates; balances untouched."""
+    action_type = action.split("_")[0]
+    status_col = _find_status_column(headers, action_type)
+    if not status_col:
+        return None
+
+    updates = {status_col: "Pending"}
+    updates.update(_detail_updates(headers, action_type, context))
+    return {"updates": updates, "new_columns": []}
+
+
+def _plan_rejected(headers: List[str], action: str, context: dict, row: dict) -> Optional[dict]:
+    """Status → Rejected; nothing else changes."""
+    status_col = _find_status_column(headers, action.split("_")[0])
+    if not status_col:
+        return None
+    return {"updates": {status_col: "Rejected"}, "new_columns": []}
+
+
+def _as_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        return None
+
+
+_BARE_BALANCE_HEADERS = frozenset({"taken", "remaining", "balance", "available"})
+# Words that mark a per-type leave counter ("Casual Leaves Taken", "Sick Leave Balance")
+_LEAVE_TYPE_WORDS = (
+    "casual", "sick", "earned", "privilege", "annual", "medical",
+    "maternity", "paternity", "unpaid", "compensatory", "comp off", "optional",
+)
+
+
+def _leave_counters(headers: List[str]) -> Optional[List[tuple]]:
+    """(header, "taken" | "remaining", leave type word or None for generic) per leave counter column.
+    None when a "Total ... Balance" header makes the layout ambiguous."""
+    counters = []
+    for h, h_lower in _lower_headers(tuple(headers)):
+        if "entitlement" in h_lower or "carry" in h_lower:
+            continue  # Limits are never changed
+        if not ("leave" in h_lower or "day" in h_lower or h_lower.strip() in _BARE_BALANCE_HEADERS):
+            continue  # e.g. "Loan Balance" is not a leave counter
+        if "taken" in h_lower:
+            kind = "taken"
+        elif "remaining" in h_lower or "balance" in h_lower or "available" in h_lower:
+            if "total" in h_lower:
+                return None  # "Total ... Balance" may be a limit or a counter; let the LLM judge
+            kind = "remaining"
+        else:
+            continue
+        leave_type = next((w for w in _LEAVE_TYPE_WORDS if w in h_lower), None)
+        counters.append((h, kind, leave_type))
+    return counters
+
+
+def _plan_leave_approved(headers: List[str], action: str, context: dict, row: dict) -> Optional[dict]:
+    """Taken += X, Remaining/Balance/Available -= X on the counters for the request's leave type,
+    entitlement untouched, status → Approved. Returns None (→ LLM) unless the duration and every
+    balance cell involved are plain numbers and at most one taken/remaining counter applies."""
+    if action.split("_")[0] != "leave":
+        return None
+    days = _as_number(context.get("duration", context.get("days")))
+    if not days or days < 0:
+        return None
+
+    counters = _leave_counters(headers)
+    if not counters:
+        return None
+    if any(t for _, _, t in counters):
+        # Per-type counters: only the requested type's columns change, and generic ones would be ambiguous
+        requested = str(context.get("leave_type") or "").lower()
+        if not requested or any(t is None for _, _, t in counters):
+            return None
+        counters = [c for c in counters if c[2] in requested]
+    # Exactly the counters to adjust: one per kind at most, otherwise the LLM decides
+    kinds = [kind for _, kind, _ in counters]
+    if not counters or len(kinds) != len(set(kinds)):
+        return None
+
+    updates: Dict[str, Any] = {}
+    for h, kind, _ in counters:
+        current = _as_number(row.get(h, 0) if row.get(h, "") != "" else 0)
+        if current is None:
+            return None
+        new_value = current + (days if kind == "taken" else -days)
+        updates[h] = int(new_value) if float(new_value).is_integer() else new_value
+
+    status_col = _find_status_column(headers, "leave")
+    if status_col:
+        updates[status_col] = "Approved"
+    return {"updates": updates, "new_columns": []}
+
+
+# Keyed by the action's status suffix ("leave_request_applied" → "applied")
+ACTION_TEMPLATES: Dict[str, Callable[[List[str], str, dict, dict], Optional[dict]]] = {
+    "applied": _plan_applied,
+    "approved": _plan_leave_approved,
+    "rejected": _plan_rejected,
+}
+
+
 # ── Build the DB Agent Graph ─────────────────────────────
 
 def build_db_agent_graph() -> StateGraph:
@@ -404,20 +679,25 @@ def build_db_agent_graph() -> StateGraph:
     graph = StateGraph(DBAgentState)
     
     # Add nodes
-    graph.add_node("connect_and_read_schema", connect_and_read_schema)
-    graph.add_node("read_employee_data", read_employee_data)
+    graph.add_node("connect_and_read", connect_and_read)
     graph.add_node("plan_updates", plan_updates)
     graph.add_node("execute_updates", execute_updates)
     graph.add_node("verify_updates", verify_updates)
     
     # Set entry point
-    graph.set_entry_point("connect_and_read_schema")
+    graph.set_entry_point("connect_and_read")
     
-    # Linear flow: connect → read → plan → execute → verify
-    graph.add_edge("connect_and_read_schema", "read_employee_data")
-    graph.add_edge("read_employee_data", "plan_updates")
+    # Linear flow: read → plan → execute → verify
+    graph.add_edge("connect_and_read", "plan_updates")
     graph.add_edge("plan_updates", "execute_updates")
-    graph.add_edge("execute_updates", "verify_updates")
+    graph.add_conditional_edges(
+        "execute_updates",
+        after_execute,
+        {
+            "verify": "verify_updates",  # Failure (retry bookkeeping) or strict verify
+            "done": END,
+        },
+    )
     
     # After verify: retry or finish
     graph.add_conditional_edges(
@@ -438,6 +718,36 @@ db_agent_graph = build_db_agent_graph().compile()
 
 # ── Public API ───────────────────────────────────────────
 
+# Immutable defaults for every run; run_db_agent overlays the inputs and fresh containers
+_INITIAL_STATE_TEMPLATE = MappingProxyType({
+    "adapter": None,
+    "primary_key": "",
+    "success": False,
+    "error": None,
+    "verification": None,
+    "retry_count": 0,
+})
+
+
+# ── In-flight Coalescing ─────────────────────────────────
+
+# Identical concurrent runs (same sheet, employee, action and context) share one result
+_INFLIGHT: Dict[str, asyncio.Future] = {}
+
+
+class _OwnerCancelled(Exception):
+    """Set on a shared future when the run that owned it was cancelled; joiners retry."""
+
+
+def _inflight_key(db_type: str, connection_config: dict, employee_id: str, action: str, context: dict) -> str:
+    payload = orjson.dumps(
+        [db_type, connection_config, employee_id, action, context],
+        default=str,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+    )
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
 async def run_db_agent(
     db_type: str,
     connection_config: dict,
@@ -460,30 +770,89 @@ async def run_db_agent(
     Returns:
         {success, updates_applied, new_columns_created, error, verification}
     """
+    key = _inflight_key(db_type, connection_config, employee_id, action, context)
+    while True:
+        pending = _INFLIGHT.get(key)
+        if pending is None:
+            break
+        logger.info(f"[DB AGENT] 🔗 Joining in-flight run for {employee_id} | Action: {action}")
+        try:
+            return dict(await asyncio.shield(pending))
+        except _OwnerCancelled:
+            # The run we joined was cancelled, not us: run it ourselves (or join a newer owner)
+            logger.info(f"[DB AGENT] 🔁 In-flight run was cancelled; retrying for {employee_id}")
+    
+    fut = asyncio.get_running_loop().create_future()
+    _INFLIGHT[key] = fut
+    try:
+        output = await _run_db_agent(db_type, connection_config, schema_map, employee_id, action, context)
+        fut.set_result(output)
+        return output
+    except asyncio.CancelledError:
+        # Joiners weren't cancelled themselves; hand them a retryable error instead
+        fut.set_exception(_OwnerCancelled())
+        fut.exception()
+        raise
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # mark retrieved so an un-joined failure isn't logged as unhandled
+        raise
+    finally:
+        _INFLIGHT.pop(key, None)
+
+
+async def _run_db_agent(
+    db_type: str,
+    connection_config: dict,
+    schema_map: dict,
+    employee_id: str,
+    action: str,
+    context: dict,
+) -> dict:
     initial_state: DBAgentState = {
+        **_INITIAL_STATE_TEMPLATE,
+        # Mutable working containers must be fresh per run
+        "headers": [],
+        "employee_data": {},
+        "update_plan": {},
+        "updates_applied": {},
+        "new_columns_created": [],
+        # Inputs
         "db_type": db_type,
         "connection_config": connection_config,
         "schema_map": schema_map,
         "employee_id": employee_id,
         "action": action,
         "context": context,
-        "headers": [],
-        "employee_data": {},
-        "primary_key": "",
-        "update_plan": {},
-        "success": False,
-        "updates_applied": {},
-        "new_columns_created": [],
-        "error": None,
-        "verification": None,
-        "retry_count": 0,
     }
     
-    print(f"\n[DB AGENT] 🚀 Starting DB Agent for {employee_id} | Action: {action}")
-    print(f"[DB AGENT] Context: {json.dumps(context, default=str)}")
+    logger.info(f"[DB AGENT] 🚀 Starting DB Agent for {employee_id} | Action: {action}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[DB AGENT] Context: %s", _dumps(context))
+    
+    # Warm adapter shared by every node (and by other runs on the same sheet)
+    try:
+        initial_state["adapter"] = await get_cached_adapter(DatabaseType(db_type), connection_config)
+    except Exception as e:
+        logger.error(f"[DB AGENT] ❌ Connection error: {e}")
+        return {
+            "success": False,
+            "updates_applied": {},
+            "new_columns_created": [],
+            "error": f"Connection failed: {str(e)}",
+            "verification": None,
+        }
     
     result = await db_agent_graph.ainvoke(initial_state)
     
+    if result.get("success") and result.get("updates_applied") and not settings.db_agent_strict_verify:
+        task = asyncio.create_task(_background_verify(
+            result["adapter"], result["primary_key"], employee_id, result["updates_applied"]
+        ))
+        _VERIFY_TASKS.add(task)
+        task.add_done_callback(_VERIFY_TASKS.discard)
+        result["verification"] = {"deferred": True}
+    
     output = {
         "success": result.get("success", False),
         "updates_applied": result.get("updates_applied", {}),
@@ -493,8 +862,8 @@ async def run_db_agent(
     }
     
     if output["success"]:
-        print(f"[DB AGENT] ✅ COMPLETED: {output['updates_applied']}")
+        logger.info(f"[DB AGENT] ✅ COMPLETED: {output['updates_applied']}")
     else:
-        print(f"[DB AGENT] ❌ FAILED: {output['error']}")
+        logger.error(f"[DB AGENT] ❌ FAILED: {output['error']}")
     
     return output
@@ -10,7 +10,7 @@ from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
 from langgraph.graph import StateGraph, END
 from app.config import settings
 from app.services.rag_service import answer_from_policies
-from app.adapters.adapter_factory import get_adapter
+from app.adapters.adapter_factory import get_cached_adapter
 from app.models.models import DatabaseType
 
 
@@ -294,7 +294,7 @@ async def handle_data_query(state: AgentState) -> AgentState:
         if not own_record:
             print(f"[{state['company_id']}][AGENT DATA QUERY] Checking adapter for direct own_record fetch...")
             db_type = DatabaseType(state.get("db_type", "google_sheets"))
-            adapter = await get_adapter(db_type, state["db_config"])
+            adapter = await get_cached_adapter(db_type, state["db_config"])
             own_record = await adapter.get_record_by_key(primary_key, employee_id, table_name=validated_schema.master_table) or {}
         
         # Step 2: Pydantic verification — ensure record belongs to THIS employee
@@ -312,7 +312,7 @@ async def handle_data_query(state: AgentState) -> AgentState:
                 print(f"[{state['company_id']}][AGENT DATA QUERY] ❌ Pydantic verification FAILED for own record: {ve}")
                 # Record doesn't match! Re-fetch with strict matching
                 db_type = DatabaseType(state.get("db_type", "google_sheets"))
-                adapter = await get_adapter(db_type, state["db_config"])
+                adapter = await get_cached_adapter(db_type, state["db_config"])
                 master_table = validated_schema.master_table
                 all_records = await adapter.get_all_records(table_name=master_table)
                 own_record = None
@@ -331,7 +331,7 @@ async def handle_data_query(state: AgentState) -> AgentState:
         if validated_schema.child_tables:
             print(f"[{state['company_id']}][AGENT DATA QUERY] Extracting data from child tables...")
             db_type = DatabaseType(state.get("db_type", "google_sheets"))
-            adapter = await get_adapter(db_type, state["db_config"])
+            adapter = await get_cached_adapter(db_type, state["db_config"])
             for child_table_name in validated_schema.child_tables.keys():
                 try:
                     all_child_recs = await adapter.get_all_records(table_name=child_table_name)
@@ -368,7 +368,7 @@ async def handle_data_query(state: AgentState) -> AgentState:
             if any(kw in user_question for kw in team_keywords):
                 print(f"[{state['company_id']}][AGENT DATA QUERY] Team/Dashboard keywords detected. Pulling team data context.")
                 db_type = DatabaseType(state.get("db_type", "google_sheets"))
-                adapter = await get_adapter(db_type, state["db_config"])
+                adapter = await get_cached_adapter(db_type, state["db_config"])
                 master_table = validated_schema.master_table
                 records = await adapter.get_all_records(table_name=master_table)
                 extra_context = f"\n\nAdditional team data (you have {role} access. Total employees: {len(records)}):\n{json.dumps(records[:50], indent=2, default=str)}"
@@ -17,16 +17,26 @@ class Settings(BaseSettings):
 
     # --- Master Database ---
     database_url: str = "sqlite+aiosqlite:///./botivate_master.db"
+    db_pool_size: int = 20
+    db_max_overflow: int = 20
+    db_pool_timeout: int = 10  # seconds to wait for a pooled connection
+    db_pool_recycle: int = 1800
+    db_null_pool: bool = False  # True when an external pooler (PgBouncer) sits in front
 
     # --- LLM ---
     openai_api_key: str = ""
     openai_model: str = "gpt-4o-mini"
+    llm_timeout_s: float = 8.0  # per-call timeout for short classification prompts
+    llm_max_retries: int = 2
+    plan_cache_ttl: int = 3600  # seconds a DB-agent update plan is reused for identical inputs
+    db_agent_strict_verify: bool = False  # True: re-read and verify writes before returning
 
     # --- Google Sheets / OAuth ---
     google_service_account_json: str = ""
     google_oauth_client_id: str = ""
     google_oauth_client_secret: str = ""
     google_oauth_redirect_uri: str = "http://localhost:5173/oauth/callback"
+    sheets_writes_per_minute: int = 55  # per spreadsheet; Google's quota is 60/min/user
 
     # --- SMTP Email ---
     smtp_host: str = "smtp.gmail.com"
@@ -34,6 +44,7 @@ class Settings(BaseSettings):
     smtp_use_tls: bool = True
     smtp_user: str = ""
     smtp_password: str = ""
+    smtp_max_connections: int = 4  # pooled connections / sender threads per SMTP account
 
     # --- JWT Auth ---
     jwt_secret_key: str = "change-this-jwt-secret"
@@ -46,6 +57,9 @@ class Settings(BaseSettings):
     # --- Upload Directories ---
     upload_dir: str = "./uploads"
 
+    # --- Concurrency ---
+    io_thread_pool_size: int = 20  # worker threads for blocking I/O (gspread, SMTP)
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
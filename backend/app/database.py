@@ -5,12 +5,30 @@ Stores company registrations, policies metadata, workflow states, etc.
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import NullPool
 from app.config import settings
 
 
+def _engine_options() -> dict:
+    """Pool tuning for server databases; SQLite keeps SQLAlchemy's defaults."""
+    if settings.database_url.startswith("sqlite"):
+        return {}
+    if settings.db_null_pool:
+        # An external pooler (e.g. PgBouncer in transaction mode) owns pooling
+        return {"poolclass": NullPool}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": True,
+    }
+
+
 engine = create_async_engine(
     settings.database_url,
     echo=(settings.app_env == "development"),
+    **_engine_options(),
 )
 
 async_session_factory = async_sessionmaker(
@@ -34,7 +52,15 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+def _create_missing_indexes(sync_conn) -> None:
+    """create_all only indexes tables it creates; add indexes declared later to existing tables."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)  # no-op when it already exists
+
+
 async def init_db():
-    """Create all tables on startup."""
+    """Create all tables (and any indexes missing from existing tables) on startup."""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_missing_indexes)
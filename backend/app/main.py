@@ -4,11 +4,15 @@ Registers all routers, initializes DB, and starts the background scheduler.
 """
 
 from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import queue
 import time
 import logging
-from fastapi import FastAPI, Request
+import logging.handlers
+from fastapi import FastAPI, HTTPException, Request
+from sqlalchemy import text
 from fastapi.middleware.cors import CORSMiddleware
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 # Set up logging for detailed backend tracking
 logging.basicConfig(
@@ -19,25 +23,17 @@ logging.basicConfig(
 logger = logging.getLogger("botivate_api")
 
 from app.config import settings
-from app.database import init_db, async_session_factory
+from app.database import init_db, engine
 from app.routers.company_router import router as company_router
 from app.routers.auth_router import router as auth_router
 from app.routers.chat_router import router as chat_router
 from app.routers.approval_router import router as approval_router, notifications_router
-from app.services.approval_service import check_pending_reminders
-
-
-# ── Background Scheduler (48h Reminders & 72h Escalation) ─
-
-scheduler = AsyncIOScheduler()
-
-
-async def reminder_job():
-    """Runs every hour to check for overdue approvals."""
-    async with async_session_factory() as db:
-        result = await check_pending_reminders(db)
-        if result["reminders_sent"] or result["escalations"]:
-            print(f"[SCHEDULER] Reminders: {result['reminders_sent']}, Escalations: {result['escalations']}")
+from app.scheduler import scheduler, start_scheduler
+from app.services.role_batcher import role_batcher
+from app.utils.http_client import close_http_client
+from app.adapters.adapter_factory import close_all as close_adapters
+from app.utils.background import shutdown_background
+from app.utils.email_service import smtp_pool
 
 
 # ── App Lifespan ──────────────────────────────────────────
@@ -45,12 +41,34 @@ async def reminder_job():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup: create tables & start scheduler. Shutdown: stop scheduler."""
+    # Bounded pool for blocking I/O offloaded via asyncio.to_thread (gspread, SMTP)
+    executor = ThreadPoolExecutor(max_workers=settings.io_thread_pool_size, thread_name_prefix="botivate-io")
+    asyncio.get_running_loop().set_default_executor(executor)
+
+    # Hand log records to a background thread so stdout writes never block the event loop
+    root_logger = logging.getLogger()
+    stream_handlers = root_logger.handlers[:]
+    log_queue: queue.Queue = queue.Queue(-1)
+    log_listener = logging.handlers.QueueListener(log_queue, *stream_handlers, respect_handler_level=True)
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    log_listener.start()
+
     await init_db()
-    scheduler.add_job(reminder_job, "interval", hours=1)
-    scheduler.start()
+    start_scheduler()
+    # Close pooled SMTP sessions before the server's idle timeout drops them
+    scheduler.add_job(smtp_pool.recycle_idle, "interval", seconds=60, id="smtp_recycle")
+    role_batcher.start()
     print(f"🚀 {settings.app_name} is running!")
     yield
     scheduler.shutdown()
+    await role_batcher.stop()
+    await shutdown_background()
+    await close_adapters()
+    await smtp_pool.close_all()
+    await close_http_client()
+    executor.shutdown(wait=False)
+    log_listener.stop()
+    root_logger.handlers = stream_handlers
 
 
 # ── Create FastAPI App ────────────────────────────────────
@@ -63,6 +81,9 @@ app = FastAPI(
 )
 
 
+MAX_LOGGED_BODY_BYTES = 4096  # JSON bodies above this are not buffered for logging
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
@@ -74,20 +95,29 @@ async def log_requests(request: Request, call_next):
     if request.query_params:
         logger.info(f"   [QUERY] {request.query_params}")
     
-    # 2. Extract and Log Body if JSON (to not block file uploads like PDFs/CSV)
+    # 2. Extract and Log Body if JSON (to not block file uploads like PDFs/CSV).
+    #    Buffering the body costs memory and latency, so only do it when DEBUG logging is on.
     content_type = request.headers.get("content-type", "")
-    if "application/json" in content_type:
-        try:
-            body = await request.body()
-            if body:
-                logger.info(f"   [PAYLOAD] {body.decode('utf-8')}")
-            
-            # Put the body back so route handler can read it
-            async def receive():
-                return {"type": "http.request", "body": body}
-            request._receive = receive
-        except Exception as e:
-            logger.warning(f"   [PAYLOAD ERROR] Failed to read body: {e}")
+    if "application/json" in content_type and logger.isEnabledFor(logging.DEBUG):
+        content_length = request.headers.get("content-length", "")
+        if not content_length.isdigit() or int(content_length) > MAX_LOGGED_BODY_BYTES:
+            # Large or chunked bodies are not buffered here; the route streams them itself
+            logger.debug("   [PAYLOAD] <%s bytes, not logged>", content_length or "unknown")
+        else:
+            try:
+                body = await request.body()
+                if body:
+                    logger.debug("   [PAYLOAD] %s", body.decode("utf-8", errors="replace"))
+
+                # Put the body back so route handler can read it (one message, then empty)
+                message = {"type": "http.request", "body": body, "more_body": False}
+                async def receive():
+                    nonlocal message
+                    current, message = message, {"type": "http.request", "body": b"", "more_body": False}
+                    return current
+                request._receive = receive
+            except Exception as e:
+                logger.warning(f"   [PAYLOAD ERROR] Failed to read body: {e}")
 
     # 3. Process the Route Logic
     try:
@@ -142,3 +172,18 @@ async def root():
 @app.get("/health")
 async def health():
     return {"status": "healthy"}
+
+
+@app.get("/healthz/db")
+async def health_db():
+    """SELECT 1 through the pool; fails fast (pool_timeout) when the pool is exhausted."""
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+    pool = engine.pool
+    return {
+        "status": "healthy",
+        "pool": pool.status() if hasattr(pool, "status") else type(pool).__name__,
+    }
@@ -6,7 +6,7 @@ Master database tables for company management.
 import uuid
 from datetime import datetime, timezone
 from sqlalchemy import (
-    Column, String, Text, Boolean, Integer, DateTime, ForeignKey, JSON, Enum as SAEnum
+    Column, String, Text, Boolean, Integer, DateTime, ForeignKey, JSON, Index, Enum as SAEnum, text
 )
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -86,6 +86,15 @@ class Company(Base):
     policies = relationship("Policy", back_populates="company", cascade="all, delete-orphan")
     databases = relationship("DatabaseConnection", back_populates="company", cascade="all, delete-orphan")
     approval_requests = relationship("ApprovalRequest", back_populates="company", cascade="all, delete-orphan")
+    # Read-only view of the connection in use, for eager loading alongside the company
+    active_db_connection = relationship(
+        "DatabaseConnection",
+        primaryjoin="and_(DatabaseConnection.company_id == Company.id, DatabaseConnection.is_active == True)",
+        # Several active rows are possible: always take the oldest, like the query this replaced
+        order_by="DatabaseConnection.created_at",
+        uselist=False,
+        viewonly=True,
+    )
 
 
 # ── Policy ────────────────────────────────────────────────
@@ -153,6 +162,17 @@ class ApprovalRequest(Base):
 
     company = relationship("Company", back_populates="approval_requests")
 
+    __table_args__ = (
+        # Reminder job: pending rows ordered by age (partial where the backend supports it)
+        Index(
+            "ix_approval_pending_created", "status", "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'"),
+        ),
+        # Employee request history: case-insensitive employee_id match, newest first
+        Index("ix_ar_emp_lower", "company_id", text("lower(employee_id)"), "created_at"),
+    )
+
 
 # ── Notification ──────────────────────────────────────────
 
@@ -168,3 +188,8 @@ class Notification(Base):
     related_request_id = Column(String, nullable=True)
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime, default=utcnow)
+
+    __table_args__ = (
+        # get_notifications: per-target lookup within a company, newest first
+        Index("ix_notif_target", "company_id", "target_employee_id", "created_at"),
+    )
@@ -3,15 +3,93 @@ Botivate HR Support - Authentication API Router
 Login system: Role + Company ID + Employee ID + Password
 """
 
+import asyncio
+import hmac
+import logging
+from typing import Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
+from app.database import get_db, async_session_factory
+from app.models.models import Company, DatabaseConnection, UserRole
 from app.models.schemas import LoginRequest, LoginResponse
-from app.services.company_service import get_company
-from app.adapters.adapter_factory import get_adapter
+from app.services.company_cache import get_company_and_conn, invalidate_company
+from app.services.role_classifier import classify_designation
+from app.services.schema_analyzer import analyze_schema
+from app.adapters.adapter_factory import get_cached_adapter, get_cached_headers, invalidate_cached_headers
 from app.utils.auth import create_access_token
+from app.utils.background import spawn
 
 router = APIRouter(prefix="/api/auth", tags=["Authentication"])
+logger = logging.getLogger("botivate_api.auth")
+
+
+# ── Schema Drift Handling ────────────────────────────────
+
+_REANALYZE_LOCKS: Dict[str, asyncio.Lock] = {}
+ROLE_COL_KEYWORDS = ("role", "designation", "title", "position")
+_ROLE_COLUMN_PENDING: set = set()  # connection ids with a role_column write in flight
+
+
+def _clean(value) -> str:
+    """Cell value as stripped text, without re-wrapping values that are already strings."""
+    if isinstance(value, str):
+        return value.strip()
+    return str(value).strip() if value is not None else ""
+
+
+def _login_columns(schema: dict) -> Optional[frozenset]:
+    """Fields login reads from the employee row; None (whole row) while the role column is unknown."""
+    if not schema.get("role_column"):
+        return None  # the keyword scan for a role column needs every field
+    return frozenset(
+        c for c in (
+            schema.get("primary_key"), "system_password", schema.get("employee_name"),
+            schema.get("role_column"), schema.get("email"),
+        ) if c
+    )
+
+
+async def _reanalyze_and_persist(company_id: str, conn_id: str, headers: List[str]) -> None:
+    """Re-run AI schema analysis off the login path and store it for the next login."""
+    lock = _REANALYZE_LOCKS.setdefault(company_id, asyncio.Lock())
+    if lock.locked():
+        return  # a re-analysis for this company is already running
+    async with lock:
+        try:
+            # analyze_schema caches by header set, so repeat drifts to a known layout skip the LLM
+            schema = (await analyze_schema(headers)).model_dump()
+            async with async_session_factory() as session:
+                await session.execute(update(DatabaseConnection).where(DatabaseConnection.id == conn_id).values(schema_map=schema))
+                await session.execute(update(Company).where(Company.id == company_id).values(schema_map=schema))
+                await session.commit()
+            invalidate_company(company_id)
+            logger.info("[%s][AUTH LOG] ✅ Re-analyzed schema in background. New primary_key: '%s'", company_id, schema.get("primary_key", ""))
+        except Exception as e:
+            logger.error("[%s][AUTH LOG] ❌ Background schema re-analysis failed: %s", company_id, e)
+        finally:
+            _REANALYZE_LOCKS.pop(company_id, None)
+
+
+async def _persist_role_column(company_id: str, conn_id: str, schema: dict, role_col: str) -> None:
+    """Store a keyword-discovered role column in the connection's schema_map."""
+    if conn_id in _ROLE_COLUMN_PENDING:
+        return
+    _ROLE_COLUMN_PENDING.add(conn_id)
+    try:
+        async with async_session_factory() as session:
+            await session.execute(
+                update(DatabaseConnection)
+                .where(DatabaseConnection.id == conn_id)
+                .values(schema_map={**schema, "role_column": role_col})
+            )
+            await session.commit()
+        invalidate_company(company_id)
+        logger.info("[%s][AUTH LOG] Saved role_column '%s' to schema", company_id, role_col)
+    except Exception as e:
+        logger.error("[%s][AUTH LOG] ❌ Could not save role_column: %s", company_id, e)
+    finally:
+        _ROLE_COLUMN_PENDING.discard(conn_id)
 
 
 @router.post("/login", response_model=LoginResponse)
@@ -24,89 +102,91 @@ async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
     employee_id = data.employee_id.strip()
     password = data.password.strip()
 
-    print(f"\n[{company_id}][AUTH LOG] 🏁 Starting Login Process for Employee ID: '{employee_id}'")
+    logger.info("[%s][AUTH LOG] 🏁 Starting Login Process for Employee ID: '%s'", company_id, employee_id)
 
-    # Step 1: Verify company exists
-    print(f"[{company_id}][AUTH LOG] Step 1: Querying database to verify company exists...")
-    company = await get_company(db, company_id)
-    if not company:
-        print(f"[{company_id}][AUTH LOG] ❌ FAILED: Company with ID '{company_id}' not found.")
+    # Steps 1+2: Company and its active database connection (TTL-cached, one joined query on a miss)
+    logger.debug("[%s][AUTH LOG] Step 1-2: Looking up company and active Database Connection...", company_id)
+    row = await get_company_and_conn(db, company_id)
+    if not row:
+        logger.warning("[%s][AUTH LOG] ❌ FAILED: Company with ID '%s' not found.", company_id, company_id)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid Company ID. Company not found.",
         )
-    print(f"[{company_id}][AUTH LOG] ✅ SUCCESS: Company found -> '{company.name}'")
-
-    # Step 2: Get company's database connection
-    print(f"[{company_id}][AUTH LOG] Step 2: Fetching active Database Connection for company...")
-    from app.models.models import DatabaseConnection
-    from sqlalchemy import select
-    result = await db.execute(
-        select(DatabaseConnection).where(
-            DatabaseConnection.company_id == company_id,
-            DatabaseConnection.is_active == True,
-        )
-    )
-    db_conn = result.scalars().first()
+    company, db_conn = row
+    logger.debug("[%s][AUTH LOG] ✅ SUCCESS: Company found -> '%s'", company_id, company.name)
+
     if not db_conn or not db_conn.schema_map:
-        print(f"[{company_id}][AUTH LOG] ❌ FAILED: Active Database Connection missing or schema_map lacks for company.")
+        logger.warning("[%s][AUTH LOG] ❌ FAILED: Active Database Connection missing or schema_map lacks for company.", company_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Company database not configured properly.",
         )
-    print(f"[{company_id}][AUTH LOG] ✅ SUCCESS: Active DB Connection found: Type -> {db_conn.db_type}")
+    logger.debug("[%s][AUTH LOG] ✅ SUCCESS: Active DB Connection found: Type -> %s", company_id, db_conn.db_type)
 
     # Step 3: Fetch employee record from the external database
-    print(f"[{company_id}][AUTH LOG] Step 3: Getting Database Adapter for type '{db_conn.db_type}'...")
-    adapter = await get_adapter(db_conn.db_type, db_conn.connection_config)
+    logger.debug("[%s][AUTH LOG] Step 3: Getting Database Adapter for type '%s'...", company_id, db_conn.db_type)
+    adapter = await get_cached_adapter(db_conn.db_type, db_conn.connection_config)
     schema = db_conn.schema_map
     primary_key = schema.get("primary_key", "")
-    print(f"[{company_id}][AUTH LOG] Current Schema Primary Key: '{primary_key}'")
+    logger.debug("[%s][AUTH LOG] Current Schema Primary Key: '%s'", company_id, primary_key)
 
-    # Auto-validate schema: if primary_key not in actual headers, re-analyze
+    # Auto-validate schema: if primary_key is gone, re-analyze in the background and ask
+    # the user to retry. Guessing another key column could match the wrong employee's row.
+    schema_stale = False
     try:
-        actual_headers = await adapter.get_headers()
-        print(f"[{company_id}][AUTH LOG] Adapter retrieved headers: {actual_headers}")
+        actual_headers = await get_cached_headers(adapter, db_conn.id)
+        logger.debug("[%s][AUTH LOG] Adapter retrieved headers: %s", company_id, actual_headers)
         if primary_key not in actual_headers:
-            print(f"[{company_id}][AUTH LOG] ⚠️ WARNING: Schema primary_key '{primary_key}' not found in actual headers. Re-analyzing schema now...")
-            from app.services.schema_analyzer import analyze_schema
-            new_schema = await analyze_schema(actual_headers)
-            schema = new_schema.model_dump()
-            db_conn.schema_map = schema
-            company.schema_map = schema
-            await db.commit()
-            primary_key = schema.get("primary_key", "")
-            print(f"[{company_id}][AUTH LOG] ✅ SUCCESS: Re-analyzed schema. New primary_key: '{primary_key}'")
+            logger.warning("[%s][AUTH LOG] ⚠️ WARNING: Schema primary_key '%s' not found in actual headers. Re-analyzing schema in background...", company_id, primary_key)
+            schema_stale = True
+            spawn(_reanalyze_and_persist(company_id, db_conn.id, actual_headers))
     except Exception as e:
-        print(f"[{company_id}][AUTH LOG] ❌ Schema validation non-fatal error: {e}")
+        logger.error("[%s][AUTH LOG] ❌ Schema validation non-fatal error: %s", company_id, e)
 
-    print(f"[{company_id}][AUTH LOG] Step 3.5: Looking up employee ID '{employee_id}' across column '{primary_key}' in DB...")
-    employee = await adapter.get_record_by_key(primary_key, employee_id)
+    if schema_stale:
+        invalidate_cached_headers(db_conn.id)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Company database layout changed and is being re-analyzed. Please try again in a moment.",
+        )
+
+    logger.debug("[%s][AUTH LOG] Step 3.5: Looking up employee ID '%s' across column '%s' in DB...", company_id, employee_id, primary_key)
+    try:
+        employee = await adapter.get_record_by_key(
+            primary_key, employee_id, columns=_login_columns(schema)
+        )
+    except Exception:
+        # Most likely the key column moved; make the next login re-read the headers
+        invalidate_cached_headers(db_conn.id)
+        raise
     
     if not employee:
-        print(f"[{company_id}][AUTH LOG] ❌ FAILED: Record for employee '{employee_id}' not found in DB.")
+        invalidate_cached_headers(db_conn.id)
+        logger.warning("[%s][AUTH LOG] ❌ FAILED: Record for employee '%s' not found in DB.", company_id, employee_id)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Invalid Employee ID. Employee not found (searched column: '{primary_key}').",
         )
-    print(f"[{company_id}][AUTH LOG] ✅ SUCCESS: Employee Record retrieved successfully from DB.")
+    logger.debug("[%s][AUTH LOG] ✅ SUCCESS: Employee Record retrieved successfully from DB.", company_id)
 
     # Step 4: Validate password
-    print(f"[{company_id}][AUTH LOG] Step 4: Validating password for employee...")
-    stored_password = str(employee.get("system_password", "")).strip()
-    if not stored_password or stored_password != password:
-        print(f"[{company_id}][AUTH LOG] ❌ FAILED: Password mismatch. Stored: '{stored_password}' (hidden), Submitted: '{password}' (hidden)")
+    logger.debug("[%s][AUTH LOG] Step 4: Validating password for employee...", company_id)
+    stored_password = _clean(employee.get("system_password", ""))
+    # Constant-time compare (bytes, so non-ASCII passwords are accepted too)
+    if not stored_password or not hmac.compare_digest(stored_password.encode(), password.encode()):
+        logger.warning("[%s][AUTH LOG] ❌ FAILED: Password mismatch for employee '%s'.", company_id, employee_id)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid password.",
         )
-    print(f"[{company_id}][AUTH LOG] ✅ SUCCESS: Password verified.")
+    logger.debug("[%s][AUTH LOG] ✅ SUCCESS: Password verified.", company_id)
 
     # Step 5: Get employee name and dynamically determine role
-    print(f"[{company_id}][AUTH LOG] Step 5: Determining employee role based on schema & data...")
+    logger.debug("[%s][AUTH LOG] Step 5: Determining employee role based on schema & data...", company_id)
     name_col = schema.get("employee_name", "")
-    employee_name = str(employee.get(name_col, "Employee")).strip()
-    print(f"[{company_id}][AUTH LOG] Employee Name resolved as: '{employee_name}'")
+    employee_name = _clean(employee.get(name_col, "Employee"))
+    logger.debug("[%s][AUTH LOG] Employee Name resolved as: '%s'", company_id, employee_name)
 
     determined_role = "employee"
     
@@ -114,93 +194,35 @@ async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
     role_col = schema.get("role_column")
     designation = ""
     if role_col and role_col in employee:
-        designation = str(employee.get(role_col, "")).strip()
+        designation = _clean(employee.get(role_col, ""))
     else:
-        # Fallback if AI didn't map a role column specifically: search via keywords
+        # Fallback if AI didn't map a role column specifically: search via keywords,
+        # then remember the column so later logins skip the scan
         for col_key, col_val in employee.items():
             k_lower = str(col_key).lower()
-            if any(kw in k_lower for kw in ["role", "designation", "title", "position"]):
+            if any(kw in k_lower for kw in ROLE_COL_KEYWORDS):
                 designation = str(col_val).strip()
+                spawn(_persist_role_column(company_id, db_conn.id, schema, col_key))
                 break
     
-    print(f"[{company_id}][AUTH LOG] Employee raw Designation/Title found in DB: '{designation}'")
+    logger.debug("[%s][AUTH LOG] Employee raw Designation/Title found in DB: '%s'", company_id, designation)
 
     if designation:
-        from app.config import settings
-        from langchain_openai import ChatOpenAI
-        from langchain_core.messages import HumanMessage
-        from pydantic import BaseModel as PydanticBaseModel, field_validator as pydantic_validator
-        
-        # Pydantic model for validated role output
-        class RoleClassification(PydanticBaseModel):
-            role: str
-            
-            @pydantic_validator('role')
-            @classmethod
-            def validate_role(cls, v):
-                allowed = {"hr", "manager", "admin", "ceo", "employee"}
-                v = v.strip().lower()
-                if v not in allowed:
-                    return "employee"  # Default to safest role
-                return v
-        
-        # If we have an openai key, let the AI categorize the arbitrary job title securely
-        if settings.openai_api_key and settings.openai_api_key != "your-openai-api-key-here":
-            try:
-                print(f"[{company_id}][AUTH LOG] AI is determining role category for '{designation}'...")
-                llm = ChatOpenAI(model=settings.openai_model, api_key=settings.openai_api_key, temperature=0)
-                prompt = f"""
-Given the employee job title/designation: "{designation}"
-Categorize it strictly into ONE of the following system roles:
-
-- "hr" → Human Resources staff, Talent Acquisition, Recruitment, People Ops, HR Executive, HR Manager
-- "manager" → Team Leads, Engineering Managers, Department Heads, Project Managers (people who supervise teams)
-- "admin" → Directors, VPs, Chief Officers (EXCEPT CEO), Senior Vice Presidents (EXECUTIVE leadership only, NOT IT administrators)
-- "ceo" → Chief Executive Officer, Founder, Owner, Managing Director, President
-- "employee" → Software Engineers, Developers, Analysts, Designers, System Administrators, IT Support, Network Engineers, Database Admins, Technical Staff, and ANY other non-leadership role
-
-CRITICAL DISTINCTION:
-- "System Administrator" / "IT Administrator" / "Network Admin" = "employee" (these are TECHNICAL roles, NOT leadership)
-- "Administrative Director" / "VP of Administration" = "admin" (these are LEADERSHIP roles)
-
-Respond ONLY with one word: hr, manager, admin, ceo, or employee.
-"""
-                resp = await llm.ainvoke([HumanMessage(content=prompt)])
-                ai_role = resp.content.strip().lower()
-                # Validate with Pydantic
-                validated = RoleClassification(role=ai_role)
-                determined_role = validated.role
-                print(f"[{company_id}][AUTH LOG] ✅ SUCCESS: AI classified '{designation}' → '{determined_role}'")
-            except Exception as e:
-                print(f"[{company_id}][AUTH LOG] ❌ ROLE AI PIPELINE ERROR: {e}. Falling back to keyword search.")
-
-        # Fallback to naive string matching if API call fails or key is missing
-        if determined_role == "employee":
-            print(f"[{company_id}][AUTH LOG] Executing Keyword Fallback for classification of '{designation}'...")
-            v_lower = designation.lower()
-            if "hr " in v_lower or v_lower == "hr" or "human resources" in v_lower or "hr executive" in v_lower:
-                determined_role = "hr"
-            elif "manager" in v_lower or "team lead" in v_lower or "head of" in v_lower:
-                determined_role = "manager"
-            elif ("director" in v_lower or "vp " in v_lower or "vice president" in v_lower) and "system" not in v_lower:
-                determined_role = "admin"
-            elif "ceo" in v_lower or "founder" in v_lower or "owner" in v_lower:
-                determined_role = "ceo"
-
-            print(f"[{company_id}][AUTH LOG] Fallback classification resulted in role: '{determined_role}'")
+        determined_role = await classify_designation(designation, company_id)
+        logger.debug("[%s][AUTH LOG] ✅ Designation '%s' classified as role: '%s'", company_id, designation, determined_role)
 
     # Security verification: If employee's email matches the registered HR email, upgrade access to HR
     email_col = schema.get("email", "")
     if email_col:
-        emp_email = str(employee.get(email_col, "")).strip().lower()
-        hr_email_addr = str(company.hr_email).strip().lower()
-        print(f"[{company_id}][AUTH LOG] Security Email Check: Employee=({emp_email}), Company HR=({hr_email_addr})")
+        emp_email = _clean(employee.get(email_col, "")).lower()
+        hr_email_addr = company.hr_email_lower
+        logger.debug("[%s][AUTH LOG] Security Email Check: Employee=(%s), Company HR=(%s)", company_id, emp_email, hr_email_addr)
         if emp_email and hr_email_addr and emp_email == hr_email_addr:
             determined_role = "hr"
-            print(f"[{company_id}][AUTH LOG] 👑 Upgraded role to HR as email matches company admin registration.")
+            logger.info("[%s][AUTH LOG] 👑 Upgraded role to HR as email matches company admin registration.", company_id)
 
     # Step 6: Create JWT token
-    print(f"[{company_id}][AUTH LOG] Step 6: Finalizing role classification: '{determined_role}'. Creating JWT Access Token...")
+    logger.debug("[%s][AUTH LOG] Step 6: Finalizing role classification: '%s'. Creating JWT Access Token...", company_id, determined_role)
     normalized_emp_id = employee_id
     token_data = {
         "company_id": company_id,
@@ -209,11 +231,13 @@ Respond ONLY with one word: hr, manager, admin, ceo, or employee.
         "role": determined_role,
     }
     access_token = create_access_token(token_data)
-    print(f"[{company_id}][AUTH LOG] ✅ SUCCESS: JWT created. Access Granted for {employee_name} ({normalized_emp_id}). Returning mapping details.")
+    logger.info("[%s][AUTH LOG] ✅ SUCCESS: JWT created. Access Granted for %s (%s). Returning mapping details.", company_id, employee_name, normalized_emp_id)
 
-    from app.models.models import UserRole
     # Map the determined role string to the enum to return
-    resolved_enum_role = UserRole(determined_role) if determined_role in [e.value for e in UserRole] else UserRole.EMPLOYEE
+    try:
+        resolved_enum_role = UserRole(determined_role)
+    except ValueError:
+        resolved_enum_role = UserRole.EMPLOYEE
 
     return LoginResponse(
         access_token=access_token,
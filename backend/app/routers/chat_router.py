@@ -11,8 +11,9 @@ from app.models.schemas import ChatMessage, ChatResponse, TokenPayload, Approval
 from app.models.models import DatabaseConnection, RequestPriority, UserRole
 from app.utils.auth import get_current_user
 from app.agents.hr_agent import chat_with_agent
-from app.adapters.adapter_factory import get_adapter
+from app.adapters.adapter_factory import get_cached_adapter
 from app.services.company_service import get_company
+from app.services.company_cache import invalidate_company
 from app.services.approval_service import create_approval_request
 
 router = APIRouter(prefix="/api/chat", tags=["Chat"])
@@ -65,7 +66,7 @@ async def send_message(
     if db_conn and schema_map:
         try:
             from app.models.schemas import VerifiedEmployeeRecord
-            adapter = await get_adapter(db_conn.db_type, db_conn.connection_config)
+            adapter = await get_cached_adapter(db_conn.db_type, db_conn.connection_config)
             primary_key = schema_map.get("primary_key", "")
             master_table = schema_map.get("master_table", None)
 
@@ -93,6 +94,7 @@ async def send_message(
                 schema_map = new_schema.model_dump()
                 db_conn.schema_map = schema_map
                 await db.commit()
+                invalidate_company(company_id)
                 primary_key = schema_map.get("primary_key", "")
                 master_table = schema_map.get("master_table", None)
                 print(f"[CHAT] Re-analyzed. New primary_key: '{primary_key}', master_table: '{master_table}'")
@@ -140,7 +142,7 @@ async def send_message(
     ]
 
     # Pre-fetch the employee's entire row using the ID from the token (validated)
-    adapter = await get_adapter(db_conn.db_type, db_conn.connection_config)
+    adapter = await get_cached_adapter(db_conn.db_type, db_conn.connection_config)
     print(f"[{company_id}][CHAT LOG] Fetching comprehensive row record for Employee ID '{employee_id}'...")
     master_table = schema_map.get("master_table", None) if schema_map else None
     employee_record = await adapter.get_record_by_key(primary_key_col, employee_id, table_name=master_table)
@@ -17,6 +17,7 @@ from app.models.schemas import (
 )
 from app.services import company_service
 from app.services.rag_service import index_text_policy, index_document_file
+from app.services.company_cache import invalidate_company
 from app.config import settings
 
 router = APIRouter(prefix="/api/companies", tags=["Companies"])
@@ -191,7 +192,7 @@ async def reanalyze_schema(
     """Re-analyze the schema of an existing database connection using AI."""
     from sqlalchemy import select
     from app.models.models import DatabaseConnection, Company
-    from app.adapters.adapter_factory import get_adapter
+    from app.adapters.adapter_factory import get_adapter, invalidate_cached_adapter, invalidate_cached_headers
     from app.services.schema_analyzer import analyze_schema
 
     result = await db.execute(
@@ -204,12 +205,14 @@ async def reanalyze_schema(
     if not db_conn:
         raise HTTPException(status_code=404, detail="Database connection not found.")
 
-    # Get fresh headers from the actual database
+    # Get fresh headers from the actual database (and drop any pooled adapter with stale state)
+    invalidate_cached_adapter(db_conn.db_type, db_conn.connection_config)
+    invalidate_cached_headers(db_conn.id)
     adapter = await get_adapter(db_conn.db_type, db_conn.connection_config)
     headers = await adapter.get_headers()
     
-    # Re-run schema analysis
-    schema_result = await analyze_schema(headers)
+    # Re-run schema analysis (explicit request: bypass the header-set cache)
+    schema_result = await analyze_schema(headers, force_refresh=True)
     new_schema = schema_result.model_dump()
     
     # Update both DatabaseConnection and Company
@@ -223,6 +226,7 @@ async def reanalyze_schema(
         company.schema_map = new_schema
     
     await db.commit()
+    invalidate_company(company_id)
 
     return {
         "message": "Schema re-analyzed successfully",
@@ -231,6 +235,13 @@ async def reanalyze_schema(
     }
 
 
+@router.post("/{company_id}/cache/invalidate")
+async def invalidate_company_lookup_cache(company_id: str):
+    """Drop the cached company/connection lookup so the next login re-reads it."""
+    invalidate_company(company_id)
+    return {"message": "Company cache invalidated"}
+
+
 # ── Employee Master Data Management ──────────────────────
 
 @router.get("/{company_id}/employee-data")
@@ -337,14 +348,22 @@ async def exchange_google_token(code_data: dict, db: AsyncSession = Depends(get_
         from sqlalchemy import select
         from app.models.models import DatabaseConnection
         dbs_result = await db.execute(select(DatabaseConnection).where(DatabaseConnection.company_id == company_id))
+        from app.adapters.adapter_factory import invalidate_cached_adapter
         dbs = dbs_result.scalars().all()
+        stale_adapters = []
         for d in dbs:
             if d.connection_config:
+                stale_adapters.append((d.db_type, d.connection_config))
                 config = dict(d.connection_config)
                 config["google_refresh_token"] = credentials.refresh_token
                 d.connection_config = config
                 
         await db.commit()
+
+        # Login, chat and approvals must pick up the new token now, not when the snapshots expire
+        invalidate_company(company_id)
+        for db_type, old_config in stale_adapters:
+            invalidate_cached_adapter(db_type, old_config)
         
         return {"message": "Email connected successfully!"}
     except Exception as e:
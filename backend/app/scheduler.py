@@ -0,0 +1,48 @@
+"""
+Botivate HR Support - Background Scheduler
+48h reminders & 72h escalation. The job is woken exactly when the earliest
+pending approval becomes due, with an hourly safety-net run behind it.
+"""
+
+from datetime import datetime, timezone
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from app.database import async_session_factory
+
+
+scheduler = AsyncIOScheduler()
+
+WAKE_JOB_ID = "reminder_wake"
+
+
+def schedule_reminder_wake(run_date: datetime) -> None:
+    """Run reminder_job at run_date, unless an earlier wake-up is already scheduled."""
+    # A past run_date would be dropped as a misfire; run it now instead
+    run_date = max(run_date, datetime.now(timezone.utc))
+    job = scheduler.get_job(WAKE_JOB_ID)
+    if job and job.next_run_time and job.next_run_time <= run_date:
+        return
+    scheduler.add_job(reminder_job, "date", run_date=run_date, id=WAKE_JOB_ID, replace_existing=True)
+
+
+async def reminder_job():
+    """Send due reminders/escalations, then schedule the next wake-up."""
+    from app.services.approval_service import (
+        check_pending_reminders, has_due_approvals, next_reminder_due_at,
+    )
+
+    async with async_session_factory() as db:
+        if await has_due_approvals(db):
+            result = await check_pending_reminders(db)
+            if result["reminders_sent"] or result["escalations"]:
+                print(f"[SCHEDULER] Reminders: {result['reminders_sent']}, Escalations: {result['escalations']}")
+
+        next_due = await next_reminder_due_at(db)
+        if next_due:
+            schedule_reminder_wake(next_due)
+
+
+def start_scheduler() -> None:
+    scheduler.add_job(reminder_job, "interval", hours=1, id="reminder_safety_net")
+    # Startup pass catches anything that came due while the server was down
+    scheduler.add_job(reminder_job, "date", id="reminder_startup")
+    scheduler.start()
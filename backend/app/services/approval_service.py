@@ -7,34 +7,38 @@ from datetime import datetime, timezone, timedelta
 from typing import List, Optional
 from fastapi import BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, insert, update, and_, or_, func
+from sqlalchemy.orm import joinedload
 from app.models.models import (
-    ApprovalRequest, Notification, Company, RequestStatus, RequestPriority, UserRole,
+    ApprovalRequest, Notification, Company, RequestStatus, RequestPriority, UserRole, generate_uuid,
 )
 from app.models.schemas import ApprovalRequestCreate, ApprovalDecision
-from app.adapters.adapter_factory import get_adapter
+from app.adapters.adapter_factory import get_cached_adapter
 from app.utils.email_service import send_oauth_email, NOTIFICATION_TEMPLATE
 from app.agents.hr_agent import get_llm
+from app.scheduler import schedule_reminder_wake
+from app.database import async_session_factory
+from app.utils.background import spawn
+from app.services.company_cache import ConnectionSnapshot, get_company_and_conn
 from langchain_core.messages import HumanMessage
 
+# ── Active Connection Lookup ─────────────────────────────
+
+async def _get_active_connection(db: AsyncSession, company_id: str) -> Optional[ConnectionSnapshot]:
+    """Company's active DB connection from the shared TTL cache (invalidated on schema/connection changes)."""
+    row = await get_company_and_conn(db, company_id)
+    return row[1] if row else None
+
+
 # ── Generate Summary Report ──────────────────────────────
 
 async def generate_summary_report(db: AsyncSession, company_id: str, employee_id: str, request_type: str, context: str, request_details: dict) -> tuple[str, dict]:
     """Generate a short, concise summary report using AI to help authorities decide."""
-    from app.models.models import DatabaseConnection
-    
-    # Get employee data
-    result = await db.execute(
-        select(DatabaseConnection).where(
-            DatabaseConnection.company_id == company_id,
-            DatabaseConnection.is_active == True,
-        )
-    )
-    db_conn = result.scalars().first()
+    db_conn = await _get_active_connection(db, company_id)
     emp_data = {}
     if db_conn and db_conn.schema_map:
         try:
-            adapter = await get_adapter(db_conn.db_type, db_conn.connection_config)
+            adapter = await get_cached_adapter(db_conn.db_type, db_conn.connection_config)
             pk = db_conn.schema_map.get("primary_key", "")
             emp_data = await adapter.get_record_by_key(pk, employee_id)
 
@@ -115,6 +119,7 @@ async def create_approval_request(
             details["manager_email"] = str(mgr_email).strip()
     
     request = ApprovalRequest(
+        id=generate_uuid(),  # known client-side so the notification can reference it before flush
         company_id=company_id,
         employee_id=data.employee_id,
         employee_name=data.employee_name,
@@ -125,10 +130,6 @@ async def create_approval_request(
         assigned_to_role=data.assigned_to_role or UserRole.MANAGER,
         status=RequestStatus.PENDING,
     )
-    db.add(request)
-    await db.commit()
-    await db.refresh(request)
-
     # Create notification for the authority
     display_type = data.request_type.replace('_', ' ').title()
     if not display_type.lower().endswith("request"):
@@ -136,14 +137,15 @@ async def create_approval_request(
 
     notification = Notification(
         company_id=company_id,
-        target_employee_id="__authority__",  # Will be resolved by role
+        target_employee_id=AUTHORITY_TARGET,  # Will be resolved by role
         title=f"New {display_type}",
         message=f"{data.employee_name or data.employee_id} has submitted a {display_type.lower()}. "
                 f"Priority: {data.priority.value.upper()}. Please review and take action.",
         notification_type="approval_request",
         related_request_id=request.id,
     )
-    db.add(notification)
+    # Request + notification in one transaction
+    db.add_all([request, notification])
     await db.commit()
 
     # ADD EMAIL NOTIFICATION
@@ -176,11 +178,11 @@ async def create_approval_request(
             except Exception as e:
                 print(f"[OAUTH EMAIL ERROR] Could not send request notification to {target_email}: {e}")
 
-    # Also write the request to the company's Google Sheet
-    try:
-        await write_request_to_sheet(db, request)
-    except Exception as e:
-        print(f"[SHEET CREATE WRITE ERROR] {e}")
+    # Wake the reminder job exactly when this request becomes due (no-op if an earlier wake exists)
+    schedule_reminder_wake(request.created_at.replace(tzinfo=timezone.utc) + REMINDER_AFTER)
+
+    # Also write the request to the company's Google Sheet (off the request path)
+    spawn(_sync_request_to_sheet(request.id), name=f"sheet-create-{request.id}")
 
     return request
 
@@ -192,10 +194,13 @@ async def process_decision(
     background_tasks: Optional[BackgroundTasks] = None
 ) -> Optional[ApprovalRequest]:
     """Authority approves or rejects a request."""
+    # Request, company and active connection in one round trip
     result = await db.execute(
-        select(ApprovalRequest).where(ApprovalRequest.id == request_id)
+        select(ApprovalRequest)
+        .options(joinedload(ApprovalRequest.company).joinedload(Company.active_db_connection))
+        .where(ApprovalRequest.id == request_id)
     )
-    request = result.scalar_one_or_none()
+    request = result.unique().scalar_one_or_none()
     if not request:
         return None
 
@@ -220,12 +225,10 @@ async def process_decision(
         related_request_id=request.id,
     )
     db.add(notification)
-    await db.commit()
-    await db.refresh(request)
+    await db.commit()  # expire_on_commit=False: request and its eager-loaded company stay usable
 
     # ADD EMAIL NOTIFICATION TO EMPLOYEE
-    company_result = await db.execute(select(Company).where(Company.id == request.company_id))
-    company = company_result.scalar_one_or_none()
+    company = request.company
     
     if company and company.google_refresh_token:
         # Fallback to HR email if employee email is missing from details
@@ -251,15 +254,8 @@ async def process_decision(
 
     # Also update the company's Google Sheet if applicable
     if background_tasks:
-        # We need to fetch connection info before passing to background task because DB session might close
-        from app.models.models import DatabaseConnection
-        result = await db.execute(
-            select(DatabaseConnection).where(
-                DatabaseConnection.company_id == request.company_id,
-                DatabaseConnection.is_active == True,
-            )
-        )
-        db_conn = result.scalars().first()
+        # Connection info was eager-loaded with the request; pass plain values since the session may close
+        db_conn = company.active_db_connection if company else None
         if db_conn and db_conn.schema_map:
             # Pass everything as serializable dicts to avoid session issues
             background_tasks.add_task(
@@ -277,10 +273,7 @@ async def process_decision(
                 request.request_details
             )
     else:
-        try:
-            await _update_sheet_status(db, request)
-        except Exception as e:
-            print(f"[SHEET UPDATE ERROR] {e}")
+        spawn(_sync_decision_to_sheet(request.id), name=f"sheet-decision-{request.id}")
 
     return request
 
@@ -354,64 +347,116 @@ async def get_pending_requests(
             filters.append(ApprovalRequest.assigned_to_role == role)
 
     result = await db.execute(select(ApprovalRequest).where(and_(*filters)))
-    return list(result.scalars().all())
+    return result.scalars().all()  # already a list
 
 
 async def get_employee_requests(
     db: AsyncSession, company_id: str, employee_id: str
 ) -> List[ApprovalRequest]:
-    """Fetch all requests for a specific employee."""
-    from sqlalchemy import func
+    """Fetch all requests for a specific employee (served by ix_ar_emp_lower)."""
     result = await db.execute(
         select(ApprovalRequest).where(
             ApprovalRequest.company_id == company_id,
             func.lower(ApprovalRequest.employee_id) == employee_id.strip().lower(),
         ).order_by(ApprovalRequest.created_at.desc())
     )
-    return list(result.scalars().all())
+    return result.scalars().all()  # already a list
 
 
 # ── Notifications ────────────────────────────────────────
 
+# Alerts for approvers are stored once per event under this synthetic target and
+# fanned out at read time to every authority role. Employees live in the company's
+# sheet (there is no users table), so expanding to per-user rows at write time
+# would cost a sheet read per alert and multiply the inserts.
+AUTHORITY_TARGET = "__authority__"
+AUTHORITY_ROLES = frozenset({UserRole.MANAGER, UserRole.HR, UserRole.ADMIN, UserRole.CEO})
+
+
 async def get_notifications(
     db: AsyncSession, company_id: str, employee_id: str, role: Optional[UserRole] = None
 ) -> List[Notification]:
     """Fetch notifications for a specific employee, including shared authority alerts."""
-    from sqlalchemy import or_
-    
     filters = [
         Notification.company_id == company_id,
     ]
     
-    # Base condition: Notifications for this specific employee
-    personal_condition = Notification.target_employee_id == employee_id
-    
-    if role in [UserRole.MANAGER, UserRole.HR, UserRole.ADMIN, UserRole.CEO]:
-        # Authority roles also see notifications targeted at "__authority__"
-        filters.append(or_(personal_condition, Notification.target_employee_id == "__authority__"))
+    if role in AUTHORITY_ROLES:
+        # Authority roles also see the shared alerts; IN keeps it one range scan per target on ix_notif_target
+        filters.append(Notification.target_employee_id.in_([employee_id, AUTHORITY_TARGET]))
     else:
-        filters.append(personal_condition)
+        # Base condition: Notifications for this specific employee
+        filters.append(Notification.target_employee_id == employee_id)
 
     result = await db.execute(
         select(Notification).where(and_(*filters)).order_by(Notification.created_at.desc())
     )
-    return list(result.scalars().all())
+    return result.scalars().all()  # already a list
 
 
 async def mark_notification_read(db: AsyncSession, notification_id: str) -> bool:
+    # Single UPDATE ... RETURNING (primary-key lookup) instead of SELECT-then-mutate
     result = await db.execute(
-        select(Notification).where(Notification.id == notification_id)
+        update(Notification)
+        .where(Notification.id == notification_id)
+        .values(is_read=True)
+        .returning(Notification.id)
     )
-    notif = result.scalar_one_or_none()
-    if notif:
-        notif.is_read = True
-        await db.commit()
-        return True
-    return False
+    updated = result.scalar_one_or_none() is not None
+    await db.commit()
+    return updated
 
 
 # ── Background: Reminders & Escalation ───────────────────
 
+REMINDER_AFTER = timedelta(hours=48)
+ESCALATION_AFTER = timedelta(hours=72)
+_REMINDER_BATCH = 500  # rows per fetch while streaming due requests
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    """created_at is stored as naive UTC; compare against naive thresholds."""
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def _due_filter(now: datetime):
+    """Pending requests past their reminder or escalation time (uses ix_approval_pending_created)."""
+    return and_(
+        ApprovalRequest.status == RequestStatus.PENDING,
+        or_(
+            and_(ApprovalRequest.reminder_sent.is_not(True),
+                 ApprovalRequest.created_at <= _naive_utc(now - REMINDER_AFTER)),
+            and_(ApprovalRequest.escalated.is_not(True),
+                 ApprovalRequest.created_at <= _naive_utc(now - ESCALATION_AFTER)),
+        ),
+    )
+
+
+async def has_due_approvals(db: AsyncSession) -> bool:
+    """Cheap EXISTS probe: is any pending request past its reminder or escalation time?"""
+    result = await db.execute(
+        select(ApprovalRequest.id).where(_due_filter(datetime.now(timezone.utc))).limit(1)
+    )
+    return result.first() is not None
+
+
+async def next_reminder_due_at(db: AsyncSession) -> Optional[datetime]:
+    """Earliest moment a pending request will need a reminder or an escalation (UTC), or None."""
+    result = await db.execute(
+        select(
+            func.min(ApprovalRequest.created_at).filter(ApprovalRequest.reminder_sent.is_not(True)),
+            func.min(ApprovalRequest.created_at).filter(ApprovalRequest.escalated.is_not(True)),
+        ).where(ApprovalRequest.status == RequestStatus.PENDING)
+    )
+    oldest_unreminded, oldest_unescalated = result.one()
+    candidates = []
+    if oldest_unreminded:
+        candidates.append(oldest_unreminded.replace(tzinfo=timezone.utc) + REMINDER_AFTER)
+    if oldest_unescalated:
+        candidates.append(oldest_unescalated.replace(tzinfo=timezone.utc) + ESCALATION_AFTER)
+    return min(candidates) if candidates else None
+
+
 async def check_pending_reminders(db: AsyncSession) -> dict:
     """
     Background task: runs periodically to check overdue approvals.
@@ -419,88 +464,120 @@ async def check_pending_reminders(db: AsyncSession) -> dict:
     - After 72 hours -> escalate
     """
     now = datetime.now(timezone.utc)
-    reminder_threshold = now - timedelta(hours=48)
-    escalation_threshold = now - timedelta(hours=72)
+    reminder_threshold = now - REMINDER_AFTER
+    escalation_threshold = now - ESCALATION_AFTER
 
-    result = await db.execute(
-        select(ApprovalRequest).where(
-            ApprovalRequest.status == RequestStatus.PENDING,
+    # Companies with due requests, in one query (email credentials)
+    company_result = await db.execute(
+        select(Company).where(
+            Company.id.in_(select(ApprovalRequest.company_id).where(_due_filter(now)).distinct())
         )
     )
-    pending = list(result.scalars().all())
+    companies = {c.id: c for c in company_result.scalars()}
 
     reminders_sent = 0
     escalations = 0
-
-    for req in pending:
+    notif_rows: List[dict] = []
+    update_rows: List[dict] = []
+    emails: List[tuple] = []
+
+    # Only rows that are actually due come back; stream them in chunks rather than
+    # materialising a large backlog at once
+    pending = await db.stream_scalars(
+        select(ApprovalRequest).where(_due_filter(now)).execution_options(yield_per=_REMINDER_BATCH)
+    )
+    async for req in pending:
         age = now - req.created_at.replace(tzinfo=timezone.utc)
 
-        # Get company credentials for email
-        company_result = await db.execute(select(Company).where(Company.id == req.company_id))
-        company = company_result.scalar_one_or_none()
+        company = companies.get(req.company_id)
         can_email = company and company.google_refresh_token
 
         # Escalation (72+ hours)
-        if age >= timedelta(hours=72) and not req.escalated:
-            req.escalated = True
-            req.status = RequestStatus.ESCALATED
-            notification = Notification(
+        if age >= ESCALATION_AFTER and not req.escalated:
+            update_rows.append({"id": req.id, "escalated": True, "status": RequestStatus.ESCALATED})
+            notification = dict(
                 company_id=req.company_id,
-                target_employee_id="__authority__",
+                target_employee_id=AUTHORITY_TARGET,
                 title=f"ESCALATED: {req.request_type} from {req.employee_name or req.employee_id}",
                 message=f"This request has been pending for over 72 hours and has been escalated.",
                 notification_type="escalation",
                 related_request_id=req.id,
             )
-            db.add(notification)
-            
-            if can_email:
-                try:
-                    html_body = NOTIFICATION_TEMPLATE.render(title=notification.title, message=notification.message, login_link="http://localhost:5173/login")
-                    await send_oauth_email(to_email=company.hr_email, subject=notification.title, html_body=html_body, refresh_token=company.google_refresh_token)
-                except:
-                    pass
             escalations += 1
 
         # Reminder (48+ hours)
-        elif age >= timedelta(hours=48) and not req.reminder_sent:
-            req.reminder_sent = True
-            notification = Notification(
+        elif age >= REMINDER_AFTER and not req.reminder_sent:
+            update_rows.append({"id": req.id, "reminder_sent": True})
+            notification = dict(
                 company_id=req.company_id,
-                target_employee_id="__authority__",
+                target_employee_id=AUTHORITY_TARGET,
                 title=f"Reminder: Pending {req.request_type} from {req.employee_name or req.employee_id}",
                 message=f"This request has been waiting for over 48 hours. Please take action.",
                 notification_type="reminder",
                 related_request_id=req.id,
             )
-            db.add(notification)
-            
-            if can_email:
-                try:
-                    html_body = NOTIFICATION_TEMPLATE.render(title=notification.title, message=notification.message, login_link="http://localhost:5173/login")
-                    await send_oauth_email(to_email=company.hr_email, subject=notification.title, html_body=html_body, refresh_token=company.google_refresh_token)
-                except:
-                    pass
             reminders_sent += 1
-
+        else:
+            continue
+
+        notif_rows.append(notification)
+        if can_email:
+            emails.append((company, notification))
+
+    # One multi-row INSERT and one executemany UPDATE (by primary key) instead of per-row flushes.
+    # Flags are committed before any email goes out, so a failed commit can't cause a resend.
+    if notif_rows:
+        await db.execute(insert(Notification), notif_rows)
+    if update_rows:
+        await db.execute(update(ApprovalRequest), update_rows)
     await db.commit()
+
+    # Emails go out after the cursor is closed and the flags are saved
+    for company, notification in emails:
+        try:
+            html_body = NOTIFICATION_TEMPLATE.render(title=notification["title"], message=notification["message"], login_link="http://localhost:5173/login")
+            await send_oauth_email(to_email=company.hr_email, subject=notification["title"], html_body=html_body, refresh_token=company.google_refresh_token)
+        except Exception as e:
+            print(f"[REMINDER EMAIL ERROR] {notification['title']} → {company.hr_email}: {e}")
     return {"reminders_sent": reminders_sent, "escalations": escalations}
 
 
+# ── Background Sheet Sync Jobs ───────────────────────────
+# Each job opens its own session and re-reads the request, so nothing is shared
+# with the (already finished) request handler.
+
+async def _sync_request_to_sheet(request_id: str) -> None:
+    try:
+        async with async_session_factory() as db:
+            request = await db.get(ApprovalRequest, request_id)
+            if request:
+                await write_request_to_sheet(db, request)
+    except Exception as e:
+        print(f"[SHEET CREATE WRITE ERROR] {e}")
+
+
+async def _sync_decision_to_sheet(request_id: str) -> None:
+    try:
+        async with async_session_factory() as db:
+            result = await db.execute(
+                select(ApprovalRequest)
+                .options(joinedload(ApprovalRequest.company).joinedload(Company.active_db_connection))
+                .where(ApprovalRequest.id == request_id)
+            )
+            request = result.unique().scalar_one_or_none()
+            if request:
+                await _update_sheet_status(db, request)
+    except Exception as e:
+        print(f"[SHEET UPDATE ERROR] {e}")
+
+
 # ── Helper: Write Request to Sheet on Creation ───────────
 
 async def write_request_to_sheet(db: AsyncSession, request: ApprovalRequest) -> None:
     """When a request is created, the DB Agent updates the Google Sheet."""
-    from app.models.models import DatabaseConnection
     from app.agents.db_agent import run_db_agent
 
-    result = await db.execute(
-        select(DatabaseConnection).where(
-            DatabaseConnection.company_id == request.company_id,
-            DatabaseConnection.is_active == True,
-        )
-    )
-    db_conn = result.scalars().first()
+    db_conn = await _get_active_connection(db, request.company_id)
     if not db_conn or not db_conn.schema_map:
         print("[SHEET WRITE] No active DB connection found for this company.")
         return
@@ -545,17 +622,11 @@ async def write_request_to_sheet(db: AsyncSession, request: ApprovalRequest) ->
 # ── Helper: Update Sheet Status After Decision ───────────
 
 async def _update_sheet_status(db: AsyncSession, request: ApprovalRequest) -> None:
-    """Update the Google Sheet after approval/rejection using the DB Agent."""
-    from app.models.models import DatabaseConnection
+    """Update the Google Sheet after approval/rejection using the DB Agent.
+    Expects `request` loaded with company.active_db_connection (see _sync_decision_to_sheet)."""
     from app.agents.db_agent import run_db_agent
 
-    result = await db.execute(
-        select(DatabaseConnection).where(
-            DatabaseConnection.company_id == request.company_id,
-            DatabaseConnection.is_active == True,
-        )
-    )
-    db_conn = result.scalars().first()
+    db_conn = request.company.active_db_connection if request.company else None
     if not db_conn or not db_conn.schema_map:
         return
 
@@ -0,0 +1,94 @@
+"""
+Botivate HR Support - Company Lookup Cache
+Per-process TTL cache of a company and its active database connection.
+Entries are plain snapshots (no session-bound ORM objects), so they are safe
+to share across requests.
+"""
+
+import copy
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+from sqlalchemy import select, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Company, DatabaseConnection, DatabaseType
+
+
+COMPANY_CACHE_TTL = 300  # seconds
+
+_COMPANY_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=COMPANY_CACHE_TTL)
+
+
+@dataclass(frozen=True)
+class CompanySnapshot:
+    id: str
+    name: str
+    hr_email: str
+    hr_email_lower: str  # normalised once for the login HR-email check
+
+
+@dataclass(frozen=True)
+class ConnectionSnapshot:
+    id: str
+    db_type: DatabaseType
+    connection_config: Dict[str, Any]
+    schema_map: Optional[Dict[str, Any]]
+
+
+CompanyAndConnection = Tuple[CompanySnapshot, Optional[ConnectionSnapshot]]
+
+
+async def get_company_and_conn(db: AsyncSession, company_id: str) -> Optional[CompanyAndConnection]:
+    """
+    Company + active database connection, served from memory when fresh.
+    Returns None if the company doesn't exist; the connection half is None when
+    the company has no active connection.
+    """
+    cached = _COMPANY_CACHE.get(company_id)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(
+        select(Company, DatabaseConnection)
+        .outerjoin(
+            DatabaseConnection,
+            and_(
+                DatabaseConnection.company_id == Company.id,
+                DatabaseConnection.is_active == True,
+            ),
+        )
+        .where(Company.id == company_id)
+        .limit(1)
+    )
+    row = result.first()
+    if not row:
+        return None
+
+    company, db_conn = row
+    entry = (
+        CompanySnapshot(
+            id=company.id,
+            name=company.name,
+            hr_email=company.hr_email,
+            hr_email_lower=str(company.hr_email or "").strip().lower(),
+        ),
+        ConnectionSnapshot(
+            id=db_conn.id,
+            db_type=db_conn.db_type,
+            connection_config=copy.deepcopy(db_conn.connection_config),
+            schema_map=copy.deepcopy(db_conn.schema_map),
+        ) if db_conn else None,
+    )
+    _COMPANY_CACHE[company_id] = entry
+    return entry
+
+
+def invalidate_company(company_id: str) -> None:
+    """Drop a company's cached lookup (call after its connection or schema changes)."""
+    _COMPANY_CACHE.pop(company_id, None)
+
+
+def clear_company_cache() -> None:
+    _COMPANY_CACHE.clear()
@@ -17,8 +17,12 @@ from app.models.schemas import (
 )
 from app.adapters.adapter_factory import get_adapter
 from app.services.schema_analyzer import analyze_schema
+from app.services.company_cache import invalidate_company
 from app.utils.password_generator import generate_secure_password
-from app.utils.email_service import send_auth_email, send_oauth_email
+from app.utils.email_service import (
+    send_auth_email, send_oauth_email, send_auth_emails_bulk, send_oauth_emails_bulk,
+    build_credential_renderer, WELCOME_TEMPLATE,
+)
 from app.config import settings
 
 
@@ -143,6 +147,8 @@ async def add_database_connection(
     db.add(db_conn)
     await db.commit()
     await db.refresh(db_conn)
+    # Visible to login/approvals right away, even if the schema analysis below fails
+    invalidate_company(company_id)
     print(f"[{company_id}][SERVICE LOG] ✅ Added Database Connection record to DB (ID: {db_conn.id}).")
 
     # Automatically analyze schema using AI
@@ -172,6 +178,7 @@ async def add_database_connection(
             company.schema_map = schema_result.model_dump()
             await db.commit()
             print(f"[{company_id}][SERVICE LOG] ✅ Schema Map applied successfully to Company record.")
+        invalidate_company(company_id)
 
     except Exception as e:
         print(f"[{company_id}][SCHEMA ANALYSIS ERROR] ❌ Detailed failure during AI Schema generation: {str(e)}")
@@ -276,27 +283,24 @@ async def auto_provision_employees(
     use_oauth = bool(company.google_refresh_token)
     
     if use_oauth or settings.smtp_user:
-        for task in email_tasks:
-            # Format the body
-            from app.utils.email_service import WELCOME_TEMPLATE
-            html_body = WELCOME_TEMPLATE.render(
-                company_name=company.name,
-                company_id=company.id,
-                employee_id=task["emp_id"],
-                password=task["password"],
-                login_link=company.login_link or settings.app_base_url,
-            )
-            subject = f"Welcome to {company.name} - Access Your HR Portal"
-            
-            if use_oauth:
-                success = await send_oauth_email(
+        # Company-constant parts of the mail are rendered once for the whole batch
+        render_welcome = build_credential_renderer(
+            WELCOME_TEMPLATE, company.name, company.id, company.login_link or settings.app_base_url,
+        )
+        subject = f"Welcome to {company.name} - Access Your HR Portal"
+        if use_oauth:
+            results = await send_oauth_emails_bulk([
+                dict(
                     to_email=task["email"],
                     subject=subject,
-                    html_body=html_body,
-                    refresh_token=company.google_refresh_token
+                    html_body=render_welcome(task["emp_id"], task["password"]),
+                    refresh_token=company.google_refresh_token,
                 )
-            else:
-                success = await send_auth_email(
+                for task in email_tasks
+            ])
+        else:
+            results = await send_auth_emails_bulk([
+                dict(
                     to_email=task["email"],
                     email_type="welcome",
                     company_name=company.name,
@@ -306,8 +310,12 @@ async def auto_provision_employees(
                     login_link=company.login_link or settings.app_base_url,
                     from_email=settings.smtp_user,
                     from_password=settings.smtp_password,
+                    html_body=render_welcome(task["emp_id"], task["password"]),
                 )
-                
+                for task in email_tasks
+            ])
+
+        for task, success in zip(email_tasks, results):
             if success:
                 sent_count += 1
                 print(f"[{company_id}][PROVISION LOG] 📧 Successfully sent email to {task['email']}")
@@ -496,7 +504,6 @@ async def create_employee_record(
                     password_val = f"{name_val[:3].capitalize()}1234"
                 
                 if email_val:
-                    from app.utils.email_service import WELCOME_TEMPLATE
                     html_body = WELCOME_TEMPLATE.render(
                         company_name=company.name,
                         company_id=company.id,
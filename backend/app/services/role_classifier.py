@@ -0,0 +1,86 @@
+"""
+Botivate HR Support - Role Classifier Service
+Maps a free-text job title/designation to a system role (hr, manager, admin, ceo, employee).
+Results are memoized per (company, normalized designation), so the LLM is only asked once
+per title and company; cache misses are classified in per-company micro-batches by role_batcher.
+"""
+
+import asyncio
+import re
+from typing import Dict, Optional, Tuple
+
+from cachetools import TTLCache
+
+from app.services.role_batcher import ALLOWED_ROLES, role_batcher
+
+
+ROLE_CACHE_TTL = 86400  # seconds; titles rarely change meaning within a day
+
+# (company_id, normalized designation) → role (covers both AI and keyword-fallback results).
+# Per company, so one tenant's answers are never served to another.
+_ROLE_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=ROLE_CACHE_TTL)
+# One lock per designation being classified, so a burst of logins makes a single LLM call
+_ROLE_LOCKS: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+
+async def classify_designation(designation: str, company_id: str) -> str:
+    """Return the system role for a designation in a company, using the cache when possible."""
+    title = designation.strip().lower()
+    if not title:
+        return "employee"
+    key = (company_id, title)
+
+    cached = _ROLE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    lock = _ROLE_LOCKS.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            # Another waiter may have filled the cache while we queued on the lock
+            cached = _ROLE_CACHE.get(key)
+            if cached is not None:
+                return cached
+
+            role = await _ai_classify(designation.strip(), company_id)
+            if role is None:
+                # No usable AI answer (unavailable, failed, truncated): keyword guess, not cached
+                return _keyword_classify(title)
+            if role == "employee":
+                role = _keyword_classify(title)
+            _ROLE_CACHE[key] = role
+            return role
+    finally:
+        if not lock.locked():
+            _ROLE_LOCKS.pop(key, None)
+
+
+async def _ai_classify(designation: str, company_id: str) -> Optional[str]:
+    """Ask the AI (via the micro-batcher) to categorize a job title; None when it gave no valid answer."""
+    ai_role = await role_batcher.classify(designation, company_id)
+    return ai_role if ai_role in ALLOWED_ROLES else None
+
+
+# Keyword fallback in one regex pass; when several roles match, the earlier
+# entry in _ROLE_PRIORITY wins (same precedence as the original if/elif chain).
+# Same substrings as that chain: the lookahead tries every offset, so keywords may overlap.
+_ROLE_RE = re.compile(
+    r"(?=(?P<hr>hr |\Ahr\Z|human resources)"
+    r"|(?P<manager>manager|team lead|head of)"
+    r"|(?P<admin>director|vp |vice president)"
+    r"|(?P<ceo>ceo|founder|owner))",
+    re.IGNORECASE,
+)
+_SYSTEM_RE = re.compile(r"system", re.IGNORECASE)
+_ROLE_PRIORITY = ("hr", "manager", "admin", "ceo")
+
+
+def _keyword_classify(designation: str) -> str:
+    """Naive keyword matching, used when the AI call fails, is unavailable, or says 'employee'."""
+    found = {m.lastgroup for m in _ROLE_RE.finditer(designation)}
+    if "admin" in found and _SYSTEM_RE.search(designation):
+        found.discard("admin")  # "System Administrator/Director" is a technical role
+    for role in _ROLE_PRIORITY:
+        if role in found:
+            return role
+    return "employee"
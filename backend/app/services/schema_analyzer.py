@@ -5,19 +5,124 @@ Identifies primary keys, communication columns, employee name, and logical group
 Zero manual mapping required.
 """
 
+import asyncio
+import hashlib
 import json
 import re
+import string
+from functools import lru_cache
 from typing import List, Dict, Union
 
+from cachetools import TTLCache
+
 from app.config import settings
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 from app.models.schemas import SchemaAnalysisResult
+from app.utils.http_client import get_http_client
+
+# ── Offline Fallback Patterns ────────────────────────────
+# One compiled scan per category instead of several substring checks per header.
+# Lookaheads carry the exclusions (e.g. a "name" column must not mention "id"/"user").
+_FALLBACK_PATTERNS = {
+    "pk": re.compile(r"employee[ _]id|emp[ _]id|staff id|emp code|id|code", re.I),
+    "name": re.compile(r"^(?!.*(?:id|user)).*name", re.I),
+    "email": re.compile(r"^(?!.*password).*email", re.I),
+    "phone": re.compile(r"^(?!.*email).*(?:phone|mobile|contact)", re.I),
+    "whatsapp": re.compile(r"whatsapp", re.I),
+    "role": re.compile(r"role|designation|position|job title", re.I),
+}
+
+
+# ── Prompt ───────────────────────────────────────────────
+# Built once at import; only the tables/headers slot changes per call.
+
+_SCHEMA_PROMPT = string.Template("""You are an advanced database schema analyzer for an HR system.
+
+Below is a dictionary of available data tables (Worksheets/SQL tables) and their respective column headers:
+
+$tables_json
+
+Your task:
+1. Identify the MASTER TABLE which contains the primary employee records.
+2. Inside that master table, identify:
+   - PRIMARY EMPLOYEE IDENTIFIER column (Employee ID, Emp Code, etc.)
+   - EMPLOYEE NAME column (Full Name, Name, etc.)
+   - EMAIL column (if present)
+   - PHONE NUMBER column (if present)
+   - WHATSAPP column (if present)
+   - ROLE OR DESIGNATION column (if present)
+3. Group ALL remaining columns in the Master Table logically into categories: personal, job, leave, payroll, status, other.
+4. Any other table provided should be placed into "child_tables", preserving its table name and indicating its columns. Try to guess what the foreign key might be if there's a column like "Emp ID" in the child table.
+
+Return ONLY valid JSON in this exact format:
+{
+  "master_table": "exact_master_table_name",
+  "primary_key": "exact_column_name_in_master",
+  "employee_name": "exact_column_name_in_master",
+  "email": "exact_column_name_or_null",
+  "phone": "exact_column_name_or_null",
+  "whatsapp": "exact_column_name_or_null",
+  "role_column": "exact_column_name_or_null",
+  "categories": {
+    "personal": ["col1"],
+    "job": ["col2"],
+    "leave": ["col3"],
+    "payroll": [],
+    "status": [],
+    "other": []
+  },
+  "child_tables": {
+    "Some Other Tab": { "columns": ["col1", "col2"], "foreign_key_candidate": "col1" }
+  }
+}
+
+Rules:
+- Use EXACT table and column names as they appear in the input.
+- Return ONLY the JSON, no Markdown.
+""")
+
+
+# ── LLM ──────────────────────────────────────────────────
+
+_ANALYSIS_TIMEOUT_S = 30  # whole-schema prompts are larger than the per-login calls
+
+
+@lru_cache(maxsize=1)
+def _llm() -> ChatOpenAI:
+    """Process-wide LLM client on the shared httpx pool (no per-call client/TLS setup)."""
+    return ChatOpenAI(
+        model=settings.openai_model,
+        api_key=settings.openai_api_key,
+        temperature=0,
+        timeout=_ANALYSIS_TIMEOUT_S,
+        max_retries=settings.llm_max_retries,
+        http_async_client=get_http_client(),
+        # JSON mode: the reply is always a parseable object, no fence stripping
+        model_kwargs={"response_format": {"type": "json_object"}},
+    )
+
+
+# ── Analysis Cache ───────────────────────────────────────
+# Header sets rarely change, so repeat analyses are served from memory.
+# Per-key locks make concurrent callers share one in-flight LLM call.
+_ANALYSIS_CACHE: TTLCache = TTLCache(maxsize=256, ttl=3600)  # headers digest → result dict
+_ANALYSIS_LOCKS: Dict[str, asyncio.Lock] = {}
 
-async def analyze_schema(headers_input: Union[List[str], Dict[str, List[str]]]) -> SchemaAnalysisResult:
+
+def _headers_key(tables_headers: Dict[str, List[str]]) -> str:
+    payload = json.dumps({t: sorted(cols) for t, cols in tables_headers.items()}, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+async def analyze_schema(
+    headers_input: Union[List[str], Dict[str, List[str]]],
+    force_refresh: bool = False,
+) -> SchemaAnalysisResult:
     """
     Analyze column headers using AI and return a structured schema map.
     This replaces all manual column mapping. Supports Multi-Table schemas.
+    Results are cached by header set; force_refresh re-runs the analysis.
     """
     # Normalize input
     if isinstance(headers_input, list):
@@ -35,18 +140,18 @@ async def analyze_schema(headers_input: Union[List[str], Dict[str, List[str]]])
         headers = tables_headers.get(master_table, []) if master_table else []
         
         for h in headers:
-            hl = h.lower().strip()
-            if not pk and any(kw in hl for kw in ["employee id", "emp id", "emp_id", "staff id", "emp code", "employee_id", "id", "code"]):
+            hl = h.strip()
+            if not pk and _FALLBACK_PATTERNS["pk"].search(hl):
                 pk = h
-            if not name and "name" in hl and "id" not in hl and "user" not in hl:
+            if not name and _FALLBACK_PATTERNS["name"].search(hl):
                 name = h
-            if not email and "email" in hl and "password" not in hl:
+            if not email and _FALLBACK_PATTERNS["email"].search(hl):
                 email = h
-            if not phone and any(kw in hl for kw in ["phone", "mobile", "contact"]) and "email" not in hl:
+            if not phone and _FALLBACK_PATTERNS["phone"].search(hl):
                 phone = h
-            if not whatsapp and "whatsapp" in hl:
+            if not whatsapp and _FALLBACK_PATTERNS["whatsapp"].search(hl):
                 whatsapp = h
-            if not role and any(kw in hl for kw in ["role", "designation", "position", "job title"]):
+            if not role and _FALLBACK_PATTERNS["role"].search(hl):
                 role = h
         
         if not pk:
@@ -56,6 +161,7 @@ async def analyze_schema(headers_input: Union[List[str], Dict[str, List[str]]])
                     break
                     
         child_tables = {k: {"columns": v} for k, v in tables_headers.items() if k != master_table}
+        mapped = {pk, name, email, phone, whatsapp, role}
         
         return SchemaAnalysisResult(
             primary_key=pk or (headers[0] if headers else "ID"),
@@ -64,66 +170,43 @@ async def analyze_schema(headers_input: Union[List[str], Dict[str, List[str]]])
             phone=phone,
             whatsapp=whatsapp,
             role_column=role,
-            categories={"other": [h for h in headers if h not in [pk, name, email, phone, whatsapp, role]]},
+            categories={"other": [h for h in headers if h not in mapped]},
             master_table=master_table,
             child_tables=child_tables
         )
 
-    llm = ChatOpenAI(
-        model=settings.openai_model,
-        api_key=settings.openai_api_key,
-        temperature=0,
-    )
+    key = _headers_key(tables_headers)
+    if not force_refresh:
+        cached = _ANALYSIS_CACHE.get(key)
+        if cached is not None:
+            return SchemaAnalysisResult(**cached)
 
-    prompt = f"""You are an advanced database schema analyzer for an HR system.
+    lock = _ANALYSIS_LOCKS.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            # A concurrent caller may have finished the analysis while we waited
+            cached = _ANALYSIS_CACHE.get(key)
+            if cached is not None and not force_refresh:
+                return SchemaAnalysisResult(**cached)
+            result = await _ai_analyze(tables_headers)
+            _ANALYSIS_CACHE[key] = result.model_dump()
+            return result
+    finally:
+        if not lock.locked():
+            _ANALYSIS_LOCKS.pop(key, None)
 
-Below is a dictionary of available data tables (Worksheets/SQL tables) and their respective column headers:
 
-{json.dumps(tables_headers, indent=2)}
+def clear_analysis_cache() -> None:
+    _ANALYSIS_CACHE.clear()
 
-Your task:
-1. Identify the MASTER TABLE which contains the primary employee records.
-2. Inside that master table, identify:
-   - PRIMARY EMPLOYEE IDENTIFIER column (Employee ID, Emp Code, etc.)
-   - EMPLOYEE NAME column (Full Name, Name, etc.)
-   - EMAIL column (if present)
-   - PHONE NUMBER column (if present)
-   - WHATSAPP column (if present)
-   - ROLE OR DESIGNATION column (if present)
-3. Group ALL remaining columns in the Master Table logically into categories: personal, job, leave, payroll, status, other.
-4. Any other table provided should be placed into "child_tables", preserving its table name and indicating its columns. Try to guess what the foreign key might be if there's a column like "Emp ID" in the child table.
 
-Return ONLY valid JSON in this exact format:
-{{
-  "master_table": "exact_master_table_name",
-  "primary_key": "exact_column_name_in_master",
-  "employee_name": "exact_column_name_in_master",
-  "email": "exact_column_name_or_null",
-  "phone": "exact_column_name_or_null",
-  "whatsapp": "exact_column_name_or_null",
-  "role_column": "exact_column_name_or_null",
-  "categories": {{
-    "personal": ["col1"],
-    "job": ["col2"],
-    "leave": ["col3"],
-    "payroll": [],
-    "status": [],
-    "other": []
-  }},
-  "child_tables": {{
-    "Some Other Tab": {{ "columns": ["col1", "col2"], "foreign_key_candidate": "col1" }}
-  }}
-}}
+async def _ai_analyze(tables_headers: Dict[str, List[str]]) -> SchemaAnalysisResult:
+    """Single LLM round-trip that maps the given tables/headers to a schema."""
+    llm = _llm()
 
-Rules:
-- Use EXACT table and column names as they appear in the input.
-- Return ONLY the JSON, no Markdown.
-"""
+    prompt = _SCHEMA_PROMPT.substitute(tables_json=json.dumps(tables_headers, indent=2))
 
     response = await llm.ainvoke([HumanMessage(content=prompt)])
-    raw = response.content.strip()
-
-    clean = re.sub(r"```json|```", "", raw).strip()
-    parsed = json.loads(clean)
+    parsed = json.loads(response.content)
 
     return SchemaAnalysisResult(**parsed)
@@ -4,11 +4,55 @@ Botivate HR Support – AI-Driven Dynamic Sheet Sync Service
 and generates the CRUD query. ZERO hardcoded column names.
 """
 
+import asyncio
+import hashlib
 import json
 import re
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
-from app.adapters.adapter_factory import get_adapter
+from cachetools import TTLCache
+from app.adapters.adapter_factory import get_cached_adapter
 from app.config import settings
+from app.utils.background import spawn
+from app.utils.http_client import get_http_client
+
+
+# ── Per-Sheet Work Queues ────────────────────────────────
+# Each spreadsheet/worksheet gets one bounded queue and a single consumer, so
+# syncs against one sheet are serialized and batched (one header read and one
+# batchUpdate per batch) while different sheets proceed in parallel.
+
+_QUEUE_MAXSIZE = 100  # producers wait (backpressure) once a sheet has this many queued syncs
+_BATCH_MAX = 20       # jobs drained into one batch
+
+_sheet_queues: Dict[str, asyncio.Queue] = {}
+_sheet_workers: Dict[str, asyncio.Task] = {}
+
+
+@dataclass
+class _SyncJob:
+    db_type: str
+    connection_config: dict
+    schema_map: dict
+    employee_id: str
+    action: str
+    context: dict
+    employee_current_data: Optional[dict]
+    future: asyncio.Future
+
+
+def _sheet_key(connection_config: dict) -> str:
+    return f"{connection_config.get('spreadsheet_id', '')}:{connection_config.get('sheet_name', '')}"
+
+
+def _new_result() -> dict:
+    return {
+        "success": False,
+        "updates_applied": {},
+        "new_columns_created": [],
+        "error": None,
+    }
 
 
 async def ai_sync_to_sheet(
@@ -30,6 +74,9 @@ async def ai_sync_to_sheet(
     4. AI generates the exact update plan (columns to update, values, new columns)
     5. Executes the updates
 
+    The work is queued on the sheet's worker and batched with other pending
+    syncs for the same sheet; this coroutine resolves with this job's result.
+
     Args:
         db_type: e.g. "google_sheets"
         connection_config: adapter connection config
@@ -43,91 +90,214 @@ async def ai_sync_to_sheet(
     Returns:
         dict with "success", "updates_applied", "new_columns_created", "error"
     """
+    key = _sheet_key(connection_config)
+    queue = _sheet_queues.get(key)
+    if queue is None:
+        queue = _sheet_queues[key] = asyncio.Queue(maxsize=_QUEUE_MAXSIZE)
+
+    job = _SyncJob(
+        db_type=db_type,
+        connection_config=connection_config,
+        schema_map=schema_map,
+        employee_id=employee_id,
+        action=action,
+        context=context,
+        employee_current_data=employee_current_data,
+        future=asyncio.get_running_loop().create_future(),
+    )
+    await queue.put(job)
+
+    worker = _sheet_workers.get(key)
+    if worker is None or worker.done():
+        _sheet_workers[key] = spawn(_sheet_worker(key, queue), name=f"sheet-sync-{key}")
+
+    return await job.future
+
+
+async def _sheet_worker(key: str, queue: asyncio.Queue) -> None:
+    """Drain the sheet's queue in batches; exits once it is empty (restarted on the next put)."""
+    jobs: List[_SyncJob] = []
+    try:
+        while not queue.empty():
+            jobs = [queue.get_nowait()]
+            while len(jobs) < _BATCH_MAX and not queue.empty():
+                jobs.append(queue.get_nowait())
+
+            # Jobs for the same employee go in later rounds, so each plan sees the previous write
+            rounds: List[List[_SyncJob]] = []
+            seen: Dict[str, int] = {}
+            for job in jobs:
+                n = seen.get(job.employee_id, 0)
+                seen[job.employee_id] = n + 1
+                if n == len(rounds):
+                    rounds.append([])
+                rounds[n].append(job)
+
+            for batch in rounds:
+                try:
+                    results = await _sync_batch(batch)
+                except Exception as e:
+                    print(f"[SHEET SYNC ERROR] {e}")
+                    results = [dict(_new_result(), error=str(e)) for _ in batch]
+                for job, res in zip(batch, results):
+                    if not job.future.done():
+                        job.future.set_result(res)
+            jobs = []
+    finally:
+        # Cancelled mid-batch (shutdown): release every waiter instead of leaving it hanging
+        for job in jobs:
+            if not job.future.done():
+                job.future.cancel()
+        if _sheet_workers.get(key) is asyncio.current_task():
+            del _sheet_workers[key]
+
+
+async def _sync_batch(jobs: List[_SyncJob]) -> List[dict]:
+    """One header read, per-job plans, one column-creation request and one write per key column."""
     from app.models.models import DatabaseType
 
-    result = {
-        "success": False,
-        "updates_applied": {},
-        "new_columns_created": [],
-        "error": None,
-    }
+    results = [_new_result() for _ in jobs]
+    first = jobs[0]
+    adapter = await get_cached_adapter(DatabaseType(first.db_type), first.connection_config)
 
-    try:
-        adapter = await get_adapter(DatabaseType(db_type), connection_config)
-        primary_key = schema_map.get("primary_key", "")
-        
+    # Step 1: Read current headers from the ACTUAL sheet (once for the whole batch)
+    headers = await adapter.get_headers()
+    print(f"[SHEET SYNC] Current headers ({len(headers)}), batch of {len(jobs)}")
+
+    async def _plan(job: _SyncJob, result: dict) -> Optional[tuple]:
+        primary_key = job.schema_map.get("primary_key", "")
         if not primary_key:
             result["error"] = "No primary_key in schema_map"
-            return result
-
-        # Step 1: Read current headers from the ACTUAL sheet
-        headers = await adapter.get_headers()
-        print(f"[SHEET SYNC] Current headers ({len(headers)}): {headers}")
+            return None
 
         # Step 2: Read the employee's current row data (for AI to see existing values)
-        if not employee_current_data:
-            employee_current_data = await adapter.get_record_by_key(primary_key, employee_id)
-        
-        if not employee_current_data:
-            result["error"] = f"Employee {employee_id} not found in sheet"
-            return result
-
-        # Step 3: Ask AI to generate the update plan
-        update_plan = await _ai_generate_update_plan(
+        employee_data = job.employee_current_data
+        if not employee_data:
+            employee_data = await adapter.get_record_by_key(primary_key, job.employee_id)
+        if not employee_data:
+            result["error"] = f"Employee {job.employee_id} not found in sheet"
+            return None
+
+        # Step 3: Ask AI to generate the update plan (identical templates share one LLM call)
+        plan = await _ai_generate_update_plan(
             headers=headers,
-            employee_data=employee_current_data,
-            employee_id=employee_id,
-            action=action,
-            context=context,
+            employee_data=employee_data,
+            employee_id=job.employee_id,
+            action=job.action,
+            context=job.context,
             primary_key=primary_key,
         )
-
-        if not update_plan:
+        if not plan:
             result["error"] = "AI could not generate update plan"
-            return result
-
-        # Step 4: Create new columns if AI says so
-        new_columns = update_plan.get("new_columns", [])
-        for col_name in new_columns:
-            if col_name and col_name not in headers:
-                try:
-                    await adapter.add_column(col_name)
-                    result["new_columns_created"].append(col_name)
-                    print(f"[SHEET SYNC] ✅ Created new column: '{col_name}'")
-                except Exception as ce:
-                    print(f"[SHEET SYNC] ❌ Failed to create column '{col_name}': {ce}")
-        
-        # Refresh headers after creating new columns
-        if new_columns:
-            headers = await adapter.get_headers()
-
-        # Step 5: Apply the updates
-        updates = update_plan.get("updates", {})
-        if updates:
-            # Filter out any columns that still don't exist after creation
-            valid_updates = {k: v for k, v in updates.items() if k in headers}
-            
-            if valid_updates:
-                success = await adapter.update_record(primary_key, employee_id, valid_updates)
-                if success:
-                    result["success"] = True
-                    result["updates_applied"] = valid_updates
-                    print(f"[SHEET SYNC] ✅ Updated {employee_id}: {valid_updates}")
-                else:
-                    result["error"] = f"update_record returned False for {employee_id}"
-                    print(f"[SHEET SYNC] ❌ update_record failed for {employee_id}")
+            return None
+        return primary_key, plan
+
+    planned = await asyncio.gather(
+        *(_plan(job, res) for job, res in zip(jobs, results)), return_exceptions=True
+    )
+    for i, p in enumerate(planned):
+        if isinstance(p, BaseException):
+            results[i]["error"] = str(p)
+            planned[i] = None
+
+    # Step 4: Proposed columns that carry no value are created together in one request;
+    # columns that do carry a value are created inline by the batched write below.
+    new_by_job: Dict[int, List[str]] = {}
+    for i, p in enumerate(planned):
+        if p:
+            new_by_job[i] = [c for c in dict.fromkeys(p[1].get("new_columns", [])) if c and c not in headers]
+    all_new = list(dict.fromkeys(c for cols in new_by_job.values() for c in cols))
+    valued = {c for i, cols in new_by_job.items() for c in cols if c in planned[i][1].get("updates", {})}
+    bare_columns = [c for c in all_new if c not in valued]
+    created_bare: List[str] = []
+    if bare_columns:
+        try:
+            created_bare = await adapter.add_columns(bare_columns)
+            headers = headers + created_bare
+            print(f"[SHEET SYNC] ✅ Created new columns: {created_bare}")
+        except Exception as ce:
+            print(f"[SHEET SYNC] ❌ Failed to create columns {bare_columns}: {ce}")
+
+    # Step 5: Apply the updates — one batched write per key column
+    writes: Dict[str, List[tuple]] = {}
+    allowed = set(headers).union(all_new)
+    for i, p in enumerate(planned):
+        if not p:
+            continue
+        primary_key, plan = p
+        results[i]["new_columns_created"] = [c for c in new_by_job[i] if c in created_bare]
+        updates = plan.get("updates", {})
+        if not updates:
+            results[i]["success"] = True
+            print(f"[SHEET SYNC] ℹ️ AI decided no updates needed for {jobs[i].employee_id}")
+            continue
+        # Only existing columns or ones the AI explicitly asked to create
+        valid_updates = {k: v for k, v in updates.items() if k in allowed}
+        if not valid_updates:
+            results[i]["error"] = "No valid columns to update after filtering"
+            continue
+        writes.setdefault(primary_key, []).append((i, valid_updates))
+
+    for primary_key, items in writes.items():
+        try:
+            outcome = await adapter.update_records(
+                primary_key, [(jobs[i].employee_id, updates) for i, updates in items]
+            )
+        except Exception as e:
+            print(f"[SHEET SYNC ERROR] {e}")
+            for i, _ in items:
+                results[i]["error"] = str(e)
+            continue
+        for i, valid_updates in items:
+            employee_id = jobs[i].employee_id
+            if outcome.get(employee_id):
+                results[i]["success"] = True
+                results[i]["updates_applied"] = valid_updates
+                inline_created = [c for c in new_by_job[i] if c in valid_updates]
+                results[i]["new_columns_created"].extend(inline_created)
+                print(f"[SHEET SYNC] ✅ Updated {employee_id}: {valid_updates}")
             else:
-                result["error"] = "No valid columns to update after filtering"
-        else:
-            result["success"] = True
-            result["updates_applied"] = {}
-            print(f"[SHEET SYNC] ℹ️ AI decided no updates needed for this action")
+                results[i]["error"] = f"update_record returned False for {employee_id}"
+                print(f"[SHEET SYNC] ❌ update_record failed for {employee_id}")
 
-    except Exception as e:
-        result["error"] = str(e)
-        print(f"[SHEET SYNC ERROR] {e}")
+    return results
+
+
+# ── Plan Templates ───────────────────────────────────────
+# The LLM plans against column names and context *keys* only, returning a template
+# with placeholders; per-request values are substituted locally. Identical
+# (headers, action, context keys) therefore share one LLM call.
+#   "{{start_date}}"          → context["start_date"]
+#   "{{row:Leave Balance}}"   → the employee's current value in that column
+#   {"$sub": [a, b]} / {"$add": [a, b]} → numeric result of the rendered operands
 
-    return result
+# Actions whose update is fixed (status/reason/date columns, no balance math) are
+# planned by keyword matching without an LLM call. Every "*_rejected" action
+# qualifies; approvals and profile updates need the row data, so they keep the LLM.
+_DETERMINISTIC_ACTIONS = frozenset({"leave_rejected", "grievance_filed"})
+
+_TEMPLATE_CACHE: TTLCache = TTLCache(maxsize=1024, ttl=1800)
+_TEMPLATE_LOCKS: Dict[str, asyncio.Lock] = {}
+_PLACEHOLDER_RE = re.compile(r"\{\{\s*(row:)?\s*([^{}]+?)\s*\}\}")
+_MISSING = object()
+_PLAN_TIMEOUT_S = 30
+
+
+@lru_cache(maxsize=1)
+def _llm():
+    """Process-wide LLM client on the shared httpx pool (no per-call client/TLS setup)."""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model=settings.openai_model,
+        api_key=settings.openai_api_key,
+        temperature=0,
+        timeout=_PLAN_TIMEOUT_S,
+        max_retries=settings.llm_max_retries,
+        http_async_client=get_http_client(),
+        # JSON mode: the reply is always a parseable object, no fence stripping
+        model_kwargs={"response_format": {"type": "json_object"}},
+    )
 
 
 async def _ai_generate_update_plan(
@@ -150,54 +320,99 @@ async def _ai_generate_update_plan(
     if not settings.openai_api_key or settings.openai_api_key == "your-openai-api-key-here":
         return _fallback_generate_update_plan(headers, action, context)
 
+    if action in _DETERMINISTIC_ACTIONS or action.endswith("_rejected"):
+        return _fallback_generate_update_plan(headers, action, context)
+
+    template = await _get_plan_template(headers, action, tuple(sorted(context)), primary_key)
+    if template is None:
+        return _fallback_generate_update_plan(headers, action, context)
+
+    plan = _render_plan(template, context, employee_data)
+    # Safety: never update the primary key
+    plan["updates"].pop(primary_key, None)
+    print(f"[SHEET SYNC AI] Rendered plan for {employee_id}: {json.dumps(plan, default=str)}")
+    return plan
+
+
+async def _get_plan_template(
+    headers: List[str],
+    action: str,
+    context_keys: tuple,
+    primary_key: str,
+) -> Optional[dict]:
+    """Cached, single-flight LLM plan template; None if the AI could not produce one."""
+    key = hashlib.blake2b(
+        json.dumps([headers, action, context_keys, primary_key]).encode(), digest_size=16
+    ).hexdigest()
+    cached = _TEMPLATE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    lock = _TEMPLATE_LOCKS.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            # Another caller may have generated it while we waited
+            cached = _TEMPLATE_CACHE.get(key)
+            if cached is not None:
+                return cached
+            template = await _ai_generate_plan_template(headers, action, context_keys, primary_key)
+            if template is not None:
+                _TEMPLATE_CACHE[key] = template
+            return template
+    finally:
+        if not lock.locked():
+            _TEMPLATE_LOCKS.pop(key, None)
+
+
+async def _ai_generate_plan_template(
+    headers: List[str],
+    action: str,
+    context_keys: tuple,
+    primary_key: str,
+) -> Optional[dict]:
     try:
-        from langchain_openai import ChatOpenAI
         from langchain_core.messages import HumanMessage
 
-        llm = ChatOpenAI(
-            model=settings.openai_model,
-            api_key=settings.openai_api_key,
-            temperature=0,
-        )
+        llm = _llm()
 
-        prompt = f"""You are an HR database administrator. You must generate the EXACT updates to write to an employee's record in their company spreadsheet.
+        prompt = f"""You are an HR database administrator. You must generate an update TEMPLATE for an employee's record in their company spreadsheet.
+The template is reused for every employee with the same action, so it must not contain any employee-specific values.
 
 CURRENT SHEET COLUMNS:
 {json.dumps(headers)}
 
-EMPLOYEE'S CURRENT ROW DATA:
-{json.dumps(employee_data, default=str, indent=2)}
-
 ACTION THAT OCCURRED: "{action}"
 
-ACTION DETAILS:
-{json.dumps(context, default=str, indent=2)}
+AVAILABLE ACTION DETAIL KEYS:
+{json.dumps(list(context_keys))}
 
 YOUR TASK:
-Based on the action and the employee's current data, decide EXACTLY which columns to update and what values to set.
+Decide EXACTLY which columns to update for this action and how their values are derived.
+
+PLACEHOLDERS (use these instead of concrete values):
+- "{{{{key}}}}" → value of an action detail key, e.g. "{{{{start_date}}}}"
+- "{{{{row:Column Name}}}}" → the employee's CURRENT value in that column
+- {{"$sub": ["{{{{row:Column Name}}}}", "{{{{key}}}}"]}} or {{"$add": [...]}} → numeric calculation
 
 CRITICAL RULES:
 1. ALWAYS use EXISTING column names from the sheet when a matching column exists.
    - Look at the actual column headers above and match them EXACTLY.
    - Example: if sheet has "Total Leave Balance", use "Total Leave Balance" — NOT "Leave Balance".
-2. For NUMERIC calculations (like deducting leave balance):
-   - Read the current value from the employee's data
-   - Calculate the new value (e.g., current balance - leave days)
-   - Return the CALCULATED number, not a formula
+2. For NUMERIC calculations (like deducting leave balance) use "$sub"/"$add" with row and detail placeholders.
 3. If no matching column exists for important data, suggest a NEW column name.
-4. For dates, use the format matching what's already in the sheet.
+4. Fixed status words (e.g. "Approved", "Pending") may be written literally.
 5. The primary key column ("{primary_key}") must NEVER be updated.
 
 EXAMPLES OF DYNAMIC BEHAVIOR:
-- If action is "leave_applied" → Find any status column related to leave and set "Pending", update leave date columns
-- If action is "leave_approved" → Update status to "Approved", CALCULATE new leave balance (old balance - days), update leaves taken
+- If action is "leave_applied" → Find any status column related to leave and set "Pending", set leave date columns from "{{{{start_date}}}}"/"{{{{end_date}}}}"
+- If action is "leave_approved" → Update status to "Approved", leave balance = {{"$sub": ["{{{{row:Total Leave Balance}}}}", "{{{{days}}}}"]}}
 - If action is "leave_rejected" → Update status to "Rejected", leave balance untouched
 
 Return ONLY valid JSON in this exact format:
 {{
   "updates": {{
-    "Existing Column Name": "new value",
-    "Another Column": 42
+    "Existing Column Name": "{{{{some_detail_key}}}}",
+    "Another Column": "Approved"
   }},
   "new_columns": ["New Column Name If Needed"]
 }}
@@ -205,34 +420,88 @@ Return ONLY valid JSON in this exact format:
 Return ONLY the JSON. No explanation, no markdown."""
 
         resp = await llm.ainvoke([HumanMessage(content=prompt)])
-        raw = resp.content.strip()
-        # Clean any markdown code fences
-        clean = re.sub(r"```json\s*|```\s*", "", raw).strip()
-        
-        plan = json.loads(clean)
+        template = json.loads(resp.content)
         
-        # Validate the plan structure
-        if not isinstance(plan, dict):
-            print(f"[SHEET SYNC AI] Invalid plan type: {type(plan)}")
-            return _fallback_generate_update_plan(headers, action, context)
+        # Validate the template structure
+        if not isinstance(template, dict):
+            print(f"[SHEET SYNC AI] Invalid plan type: {type(template)}")
+            return None
         
-        if "updates" not in plan:
-            plan["updates"] = {}
-        if "new_columns" not in plan:
-            plan["new_columns"] = []
+        if not isinstance(template.get("updates"), dict):
+            template["updates"] = {}
+        if not isinstance(template.get("new_columns"), list):
+            template["new_columns"] = []
         
-        # Safety: never update the primary key
-        plan["updates"].pop(primary_key, None)
-        
-        print(f"[SHEET SYNC AI] Generated plan: {json.dumps(plan, default=str)}")
-        return plan
+        print(f"[SHEET SYNC AI] Generated plan template: {json.dumps(template, default=str)}")
+        return template
 
     except json.JSONDecodeError as je:
         print(f"[SHEET SYNC AI] JSON parse error: {je}")
-        return _fallback_generate_update_plan(headers, action, context)
+        return None
     except Exception as e:
         print(f"[SHEET SYNC AI] Error: {e}")
-        return _fallback_generate_update_plan(headers, action, context)
+        return None
+
+
+def _render_plan(template: dict, context: dict, employee_data: dict) -> dict:
+    """Substitute per-request values into a cached plan template (pure Python, no I/O)."""
+    updates = {}
+    for column, spec in template.get("updates", {}).items():
+        value = _render_value(spec, context, employee_data)
+        if value is not _MISSING:
+            updates[column] = value
+    return {"updates": updates, "new_columns": list(template.get("new_columns", []))}
+
+
+def _render_value(spec: Any, context: dict, employee_data: dict) -> Any:
+    if isinstance(spec, dict) and len(spec) == 1 and next(iter(spec)) in ("$sub", "$add"):
+        op, operands = next(iter(spec.items()))
+        if not isinstance(operands, list) or len(operands) != 2:
+            return _MISSING
+        a, b = (_to_number(_render_value(x, context, employee_data)) for x in operands)
+        if a is None or b is None:
+            return _MISSING
+        result = a - b if op == "$sub" else a + b
+        return int(result) if result == int(result) else result
+
+    if not isinstance(spec, str):
+        return spec
+
+    whole = _PLACEHOLDER_RE.fullmatch(spec.strip())
+    if whole:
+        # A lone placeholder keeps the source value's type (numbers stay numbers)
+        return _lookup(whole, context, employee_data)
+
+    missing = False
+
+    def _sub(m: "re.Match") -> str:
+        nonlocal missing
+        value = _lookup(m, context, employee_data)
+        if value is _MISSING:
+            missing = True
+            return ""
+        return str(value)
+
+    rendered = _PLACEHOLDER_RE.sub(_sub, spec)
+    return _MISSING if missing else rendered
+
+
+def _lookup(match: "re.Match", context: dict, employee_data: dict) -> Any:
+    source = employee_data if match.group(1) else context
+    value = source.get(match.group(2), _MISSING)
+    return _MISSING if value is None else value
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+_WORD_RE = re.compile(r"[a-z]+")
 
 
 def _fallback_generate_update_plan(
@@ -255,22 +524,30 @@ def _fallback_generate_update_plan(
     reason_col = None
     date_from_col = None
     date_to_col = None
+    decided_col = None
     
+    # Single pass: each header is lower-cased once and checked for every role.
+    # Date roles match whole words, so "Total Leave Balance" is not a "to" column.
     for h in headers:
         h_lower = h.lower()
-        if action_type in h_lower and "status" in h_lower:
-            status_col = h
-        if action_type in h_lower and "reason" in h_lower:
-            reason_col = h
-        if action_type in h_lower and ("from" in h_lower or "start" in h_lower):
-            date_from_col = h
-        if action_type in h_lower and ("to" in h_lower or "end" in h_lower):
-            date_to_col = h
+        words = set(_WORD_RE.findall(h_lower))
+        if action_type in h_lower:
+            if "status" in h_lower:
+                status_col = h
+            if "reason" in h_lower:
+                reason_col = h
+            if words & {"from", "start"}:
+                date_from_col = h
+            if words & {"to", "end"}:
+                date_to_col = h
         # Also check for "upcoming" variants
-        if "upcoming" in h_lower and "from" in h_lower:
-            date_from_col = date_from_col or h
-        if "upcoming" in h_lower and "to" in h_lower:
-            date_to_col = date_to_col or h
+        if "upcoming" in words:
+            if "from" in words:
+                date_from_col = date_from_col or h
+            if "to" in words:
+                date_to_col = date_to_col or h
+        if decided_col is None and ("decided" in h_lower or "approved by" in h_lower):
+            decided_col = h
 
     # Determine status value based on action
     status_value = "Pending"
@@ -292,19 +569,15 @@ def _fallback_generate_update_plan(
     if context.get("reason") and reason_col:
         updates[reason_col] = context["reason"]
     
-    if context.get("start_date") and date_from_col:
-        updates[date_from_col] = context["start_date"]
-    
-    if context.get("end_date") and date_to_col:
-        updates[date_to_col] = context["end_date"]
-
-    if context.get("decided_by"):
-        decided_col = None
-        for h in headers:
-            if "decided" in h.lower() or "approved by" in h.lower():
-                decided_col = h
-                break
-        if decided_col:
-            updates[decided_col] = context["decided_by"]
+    # A rejection only records the outcome: no dates land in "Upcoming ..." or range columns
+    if status_value != "Rejected":
+        if context.get("start_date") and date_from_col:
+            updates[date_from_col] = context["start_date"]
+
+        if context.get("end_date") and date_to_col:
+            updates[date_to_col] = context["end_date"]
+
+    if context.get("decided_by") and decided_col:
+        updates[decided_col] = context["decided_by"]
 
     return {"updates": updates, "new_columns": new_columns}
@@ -3,9 +3,10 @@ Botivate HR Support - JWT Authentication Utility
 Handles token creation and verification for the login system.
 """
 
-from datetime import datetime, timedelta, timezone
+import time
+from datetime import timedelta
 from typing import Optional
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.config import settings
@@ -14,20 +15,22 @@ from app.models.schemas import TokenPayload
 security = HTTPBearer()
 
 
+# Key object built once; jose otherwise re-parses the secret on every encode/decode
+_SIGNING_KEY = jwk.construct(settings.jwt_secret_key, settings.jwt_algorithm)
+_DEFAULT_TTL_S = settings.jwt_expiration_minutes * 60
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT token with the given payload."""
-    to_encode = data.copy()
-    expire = datetime.now(timezone.utc) + (
-        expires_delta or timedelta(minutes=settings.jwt_expiration_minutes)
-    )
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
+    ttl = int(expires_delta.total_seconds()) if expires_delta else _DEFAULT_TTL_S
+    to_encode = {**data, "exp": int(time.time()) + ttl}
+    return jwt.encode(to_encode, _SIGNING_KEY, algorithm=settings.jwt_algorithm)
 
 
 def verify_token(token: str) -> TokenPayload:
     """Verify and decode a JWT token."""
     try:
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        payload = jwt.decode(token, _SIGNING_KEY, algorithms=[settings.jwt_algorithm])
         return TokenPayload(
             company_id=payload.get("company_id", ""),
             employee_id=payload.get("employee_id", ""),
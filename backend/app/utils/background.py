@@ -0,0 +1,39 @@
+"""
+Botivate HR Support - Background Job Helper
+Fire-and-forget coroutines (sheet syncs, schema writes) that must not hold the
+HTTP request open. Tasks are tracked so they aren't garbage-collected mid-flight,
+failures are logged, and shutdown waits briefly for in-flight work.
+"""
+
+import asyncio
+import logging
+from typing import Coroutine, Optional, Set
+
+logger = logging.getLogger("botivate_api.background")
+
+_TASKS: Set[asyncio.Task] = set()
+
+
+def _on_done(task: asyncio.Task) -> None:
+    _TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("[BACKGROUND] ❌ Job %s failed: %r", task.get_name(), task.exception())
+
+
+def spawn(coro: Coroutine, name: Optional[str] = None) -> asyncio.Task:
+    """Schedule a coroutine on the running loop without awaiting it."""
+    task = asyncio.create_task(coro, name=name)
+    _TASKS.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+async def shutdown_background(timeout: float = 10.0) -> None:
+    """Give in-flight jobs `timeout` seconds to finish, then cancel the rest."""
+    if not _TASKS:
+        return
+    _, pending = await asyncio.wait(set(_TASKS), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -3,16 +3,21 @@ Botivate HR Support - Email Utility
 Sends credential distribution and notification emails using company-configured SMTP.
 """
 
-import smtplib
+import atexit
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import Optional
+from email.message import Message
+from html import unescape
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
 from app.config import settings
-from jinja2 import Template
+from jinja2 import DictLoader, Environment, Template
+from markupsafe import escape
 import asyncio
 import base64
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+import aiosmtplib
 
 
 # ── Professional Email Templates ──────────────────────────
@@ -36,7 +41,7 @@ COMMON_STYLE = """
   .footer p { color: #9ca3af; font-size: 12px; margin: 0; }
 """
 
-WELCOME_TEMPLATE = Template(f"""
+_WELCOME_HTML = f"""
 <!DOCTYPE html>
 <html>
 <head><style>{COMMON_STYLE}</style></head>
@@ -64,9 +69,9 @@ WELCOME_TEMPLATE = Template(f"""
 </div>
 </body>
 </html>
-""")
+"""
 
-PASSWORD_UPDATE_TEMPLATE = Template(f"""
+_PASSWORD_UPDATE_HTML = f"""
 <!DOCTYPE html>
 <html>
 <head><style>{COMMON_STYLE}</style></head>
@@ -94,10 +99,10 @@ PASSWORD_UPDATE_TEMPLATE = Template(f"""
 </div>
 </body>
 </html>
-""")
+"""
 
 
-NOTIFICATION_TEMPLATE = Template("""
+_NOTIFICATION_HTML = """
 <!DOCTYPE html>
 <html>
 <head>
@@ -145,7 +150,235 @@ NOTIFICATION_TEMPLATE = Template("""
 </div>
 </body>
 </html>
-""")
+"""
+
+
+def _minify_html(src: str) -> str:
+    """Drop layout-only whitespace once at load time so every rendered mail is smaller."""
+    src = re.sub(r">\s*\n\s*<", "><", src)  # only line breaks between tags; inline spacing stays
+    return re.sub(r"\s{2,}", " ", src).strip()
+
+
+_ENV = Environment(
+    loader=DictLoader({
+        "welcome.html": _minify_html(_WELCOME_HTML),
+        "password_update.html": _minify_html(_PASSWORD_UPDATE_HTML),
+        "notification.html": _minify_html(_NOTIFICATION_HTML),
+    }),
+    auto_reload=False,
+    autoescape=True,
+)
+
+WELCOME_TEMPLATE = _ENV.get_template("welcome.html")
+PASSWORD_UPDATE_TEMPLATE = _ENV.get_template("password_update.html")
+NOTIFICATION_TEMPLATE = _ENV.get_template("notification.html")
+
+
+# ── Plain-Text Alternative ────────────────────────────────
+# Derived from the already-rendered HTML, so there is no second template to keep in sync.
+
+_HEAD_RE = re.compile(r"<head\b.*?</head>", re.S | re.I)
+_LINK_RE = re.compile(r'<a\b[^>]*href="([^"]*)"[^>]*>(.*?)</a>', re.S | re.I)
+_BLOCK_RE = re.compile(r"<br\s*/?>|</(?:p|div|h[1-6]|tr|li)>", re.I)
+_PAIR_RE = re.compile(r"</span>\s*(?=<span\b)", re.I)  # label/value spans on credential rows
+_TAG_RE = re.compile(r"<[^>]+>")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+
+
+def _html_to_text(html_body: str) -> str:
+    text = _HEAD_RE.sub("", html_body)
+    text = _LINK_RE.sub(r"\2: \1", text)
+    text = _BLOCK_RE.sub("\n", _PAIR_RE.sub(": ", text))
+    text = unescape(_TAG_RE.sub("", text))
+    text = "\n".join(line.strip() for line in text.splitlines())
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+# ── Per-Company Credential Rendering ──────────────────────
+# In a provisioning batch only the employee ID and password differ between
+# mails, so the template is rendered once per company with slot markers and each
+# recipient's body is a plain string join (no template walk per employee).
+
+_EMP_SLOT = "\ue000employee_id\ue000"
+_PWD_SLOT = "\ue000password\ue000"
+
+
+def build_credential_renderer(
+    template: Template, company_name: str, company_id: str, login_link: str
+) -> Callable[[str, str], str]:
+    """Return render(employee_id, password) -> html for WELCOME_TEMPLATE / PASSWORD_UPDATE_TEMPLATE."""
+    shell = template.render(
+        company_name=company_name,
+        company_id=company_id,
+        employee_id=_EMP_SLOT,
+        password=_PWD_SLOT,
+        login_link=login_link,
+    )
+    parts = []
+    for chunk in shell.split(_EMP_SLOT):
+        parts.append(chunk.split(_PWD_SLOT))
+
+    def render(employee_id: str, password: str) -> str:
+        # Slot values bypass the template, so escape them as autoescape would
+        employee_id, password = str(escape(employee_id)), str(escape(password))
+        return employee_id.join(password.join(pieces) for pieces in parts)
+
+    return render
+
+
+# ── SMTP Settings ─────────────────────────────────────────
+# Settings are fixed for the process lifetime, so the send paths read one
+# module-level snapshot instead of going back to the settings object per mail.
+
+class _SmtpConfig(NamedTuple):
+    host: str
+    port: int
+    use_tls: bool
+    user: str
+    password: str
+
+
+_SMTP = _SmtpConfig(
+    host=settings.smtp_host,
+    port=settings.smtp_port,
+    use_tls=settings.smtp_use_tls,
+    user=settings.smtp_user,
+    password=settings.smtp_password,
+)
+
+# No real SMTP password configured: senders print to the console instead (decided once)
+_LOCAL_MOCK = not _SMTP.password or _SMTP.password == "your-email-password-here"
+
+
+# ── SMTP Connection Pool ──────────────────────────────────
+# Opening a transport costs TCP + STARTTLS + AUTH round trips, which dominates a
+# bulk credential run. Warm connections are kept per (host, port, user), checked
+# with NOOP when they have sat idle, and recycled before the server times them out.
+
+_SMTP_POOL_SIZE = settings.smtp_max_connections  # idle connections kept per (host, port, user)
+_SMTP_IDLE_TIMEOUT = 60    # seconds; servers typically drop idle sessions after a few minutes
+_SMTP_NOOP_AFTER = 5       # seconds idle before a NOOP liveness check on reuse
+
+PoolKey = Tuple[str, int, str]
+
+# The Gmail API client is blocking, so OAuth sends run on their own threads, sized
+# to the pool, instead of competing with the default executor's other users.
+_SMTP_EXECUTOR = ThreadPoolExecutor(max_workers=_SMTP_POOL_SIZE, thread_name_prefix="smtp")
+atexit.register(_SMTP_EXECUTOR.shutdown)
+
+
+def _in_smtp_thread(fn: Callable, *args) -> Awaitable:
+    return asyncio.get_running_loop().run_in_executor(_SMTP_EXECUTOR, fn, *args)
+
+
+# SMTP itself is spoken with aiosmtplib, so sends stay on the event loop.
+
+async def _open_smtp(host: str, port: int, user: str, password: str) -> aiosmtplib.SMTP:
+    client = aiosmtplib.SMTP(hostname=host, port=port, start_tls=_SMTP.use_tls, timeout=30)
+    await client.connect()
+    await client.login(user, password)
+    return client
+
+
+async def _is_alive(conn: aiosmtplib.SMTP) -> bool:
+    try:
+        return (await conn.noop()).code == 250
+    except (aiosmtplib.SMTPException, OSError):
+        return False
+
+
+async def _close_quietly(conn: aiosmtplib.SMTP, send_quit: bool = False) -> None:
+    # Eviction just drops the transport: every message on it was already accepted, and
+    # waiting for QUIT's 221 reply costs a round trip. send_quit is for orderly shutdown.
+    if send_quit:
+        try:
+            await conn.quit()
+            return
+        except Exception:
+            pass
+    conn.close()
+
+
+async def _send_with_conn(conn: aiosmtplib.SMTP, msg: Message) -> None:
+    await conn.send_message(msg)
+
+
+class SMTPConnectionPool:
+    """Per-(host, port, user) queues of idle, authenticated SMTP connections."""
+
+    def __init__(self, maxsize: int = _SMTP_POOL_SIZE):
+        self._maxsize = maxsize
+        self._idle: Dict[PoolKey, asyncio.Queue] = {}
+
+    def _queue(self, key: PoolKey) -> asyncio.Queue:
+        q = self._idle.get(key)
+        if q is None:
+            q = self._idle[key] = asyncio.Queue(maxsize=self._maxsize)
+        return q
+
+    async def acquire(self, host: str, port: int, user: str, password: str) -> aiosmtplib.SMTP:
+        """A warm connection if one is idle and still alive, otherwise a freshly authenticated one."""
+        q = self._queue((host, port, user))
+        while not q.empty():
+            conn, idle_since = q.get_nowait()
+            if time.monotonic() - idle_since < _SMTP_NOOP_AFTER or await _is_alive(conn):
+                return conn
+            await _close_quietly(conn)
+        return await _open_smtp(host, port, user, password)
+
+    async def release(self, host: str, port: int, user: str, conn: aiosmtplib.SMTP, broken: bool = False) -> None:
+        """Return a connection for reuse (or close it if it failed or the pool is full)."""
+        q = self._queue((host, port, user))
+        if broken or q.full():
+            await _close_quietly(conn)
+            return
+        q.put_nowait((conn, time.monotonic()))
+
+    async def recycle_idle(self) -> None:
+        """Close connections idle past _SMTP_IDLE_TIMEOUT (run periodically by the scheduler)."""
+        now = time.monotonic()
+        stale = []
+        for q in self._idle.values():
+            keep = []
+            while not q.empty():
+                conn, idle_since = q.get_nowait()
+                (stale if now - idle_since > _SMTP_IDLE_TIMEOUT else keep).append((conn, idle_since))
+            for item in keep:
+                q.put_nowait(item)
+        for conn, _ in stale:
+            await _close_quietly(conn)
+
+    async def close_all(self) -> None:
+        """QUIT every idle connection (application shutdown)."""
+        conns = []
+        for q in self._idle.values():
+            while not q.empty():
+                conns.append(q.get_nowait()[0])
+        self._idle.clear()
+        for conn in conns:
+            await _close_quietly(conn, send_quit=True)
+
+
+smtp_pool = SMTPConnectionPool()
+
+
+async def _smtp_send(msg: Message, user: str, password: str) -> None:
+    """Send through a pooled connection; a dropped warm connection gets one retry on a fresh one."""
+    host, port = _SMTP.host, _SMTP.port
+    for attempt in (1, 2):
+        conn = await smtp_pool.acquire(host, port, user, password)
+        try:
+            await _send_with_conn(conn, msg)
+        except aiosmtplib.SMTPServerDisconnected:
+            await smtp_pool.release(host, port, user, conn, broken=True)
+            if attempt == 2:
+                raise
+            continue
+        except Exception:
+            await smtp_pool.release(host, port, user, conn, broken=True)
+            raise
+        await smtp_pool.release(host, port, user, conn)
+        return
 
 
 async def send_auth_email(
@@ -158,8 +391,10 @@ async def send_auth_email(
     login_link: str,
     from_email: str,
     from_password: str,
+    html_body: Optional[str] = None,
 ) -> bool:
-    """Send professional authentication emails (Welcome or Password Update)."""
+    """Send professional authentication emails (Welcome or Password Update).
+    Pass `html_body` when it was already rendered (see build_credential_renderer)."""
     
     if email_type == "welcome":
         template = WELCOME_TEMPLATE
@@ -168,23 +403,8 @@ async def send_auth_email(
         template = PASSWORD_UPDATE_TEMPLATE
         subject = f"Security Notification: Your Password for {company_name} has been updated"
 
-    html_body = template.render(
-        company_name=company_name,
-        company_id=company_id,
-        employee_id=employee_id,
-        password=password,
-        login_link=login_link,
-    )
-
-    msg = MIMEMultipart("alternative")
-    sender_email = settings.smtp_user or from_email
-    msg["From"] = sender_email
-    msg["To"] = to_email
-    msg["Subject"] = subject
-    msg.attach(MIMEText(html_body, "html"))
-
     # LOCAL TESTING MODE: Mock only if SMTP is not configured
-    if not settings.smtp_password or settings.smtp_password == "your-email-password-here":
+    if _LOCAL_MOCK:
         print("="*60)
         print(f"📧 [LOCAL MOCK EMAIL] Type: {email_type.upper()} | To: {to_email}")
         print(f"📧 Subject: {subject}")
@@ -192,20 +412,30 @@ async def send_auth_email(
         print("="*60)
         return True
 
-    def _send_sync():
-        try:
-            server = smtplib.SMTP(settings.smtp_host, settings.smtp_port)
-            if settings.smtp_use_tls:
-                server.starttls()
-            server.login(settings.smtp_user or from_email, settings.smtp_password or from_password)
-            server.send_message(msg)
-            server.quit()
-            return True
-        except Exception as e:
-            print(f"[EMAIL ERROR] Failed to send {email_type} email to {to_email}: {e}")
-            return False
+    if html_body is None:
+        html_body = template.render(
+            company_name=company_name,
+            company_id=company_id,
+            employee_id=employee_id,
+            password=password,
+            login_link=login_link,
+        )
 
-    return await asyncio.to_thread(_send_sync)
+    # text/plain first, HTML last: clients show the richest part they support
+    msg = MIMEMultipart("alternative")
+    msg.attach(MIMEText(_html_to_text(html_body), "plain", "utf-8"))
+    msg.attach(MIMEText(html_body, "html", "utf-8"))
+    sender_email = _SMTP.user or from_email
+    msg["From"] = sender_email
+    msg["To"] = to_email
+    msg["Subject"] = subject
+
+    try:
+        await _smtp_send(msg, _SMTP.user or from_email, _SMTP.password or from_password)
+        return True
+    except Exception as e:
+        print(f"[EMAIL ERROR] Failed to send {email_type} email to {to_email}: {e}")
+        return False
 
 
 async def send_notification_email(
@@ -221,6 +451,17 @@ async def send_notification_email(
     action_status: Optional[str] = None,
 ) -> bool:
     """Send a notification email (approval request, status update, reminder, etc.)"""
+    # LOCAL TESTING MODE: If no password is provided, just print the email to the console!
+    if _LOCAL_MOCK:
+        print("="*60)
+        print(f"📧 [LOCAL MOCK NOTIFICATION] To: {to_email}")
+        print(f"📧 Subject: {title}")
+        print(f"📧 Message: {message}")
+        if login_link:
+            print(f"📧 Link: {login_link}")
+        print("="*60)
+        return True
+
     html_body = NOTIFICATION_TEMPLATE.render(
         company_name=company_name,
         title=title,
@@ -231,38 +472,18 @@ async def send_notification_email(
         status=action_status,
     )
 
-    msg = MIMEMultipart("alternative")
-    sender_email = settings.smtp_user or from_email
+    msg = MIMEText(html_body, "html", "utf-8")
+    sender_email = _SMTP.user or from_email
     msg["From"] = sender_email
     msg["To"] = to_email
     msg["Subject"] = title
-    msg.attach(MIMEText(html_body, "html"))
 
-    # LOCAL TESTING MODE: If no password is provided, just print the email to the console!
-    if not settings.smtp_password or settings.smtp_password == "your-email-password-here":
-        print("="*60)
-        print(f"📧 [LOCAL MOCK NOTIFICATION] To: {to_email}")
-        print(f"📧 Subject: {title}")
-        print(f"📧 Message: {message}")
-        if login_link:
-            print(f"📧 Link: {login_link}")
-        print("="*60)
+    try:
+        await _smtp_send(msg, _SMTP.user or from_email, _SMTP.password or from_password)
         return True
-
-    def _send_sync_notif():
-        try:
-            server = smtplib.SMTP(settings.smtp_host, settings.smtp_port)
-            if settings.smtp_use_tls:
-                server.starttls()
-            server.login(settings.smtp_user or from_email, settings.smtp_password or from_password)
-            server.send_message(msg)
-            server.quit()
-            return True
-        except Exception as e:
-            print(f"[EMAIL ERROR] Failed to send notification to {to_email}: {e}")
-            return False
-
-    return await asyncio.to_thread(_send_sync_notif)
+    except Exception as e:
+        print(f"[EMAIL ERROR] Failed to send notification to {to_email}: {e}")
+        return False
 
 
 async def send_oauth_email(
@@ -272,6 +493,9 @@ async def send_oauth_email(
     refresh_token: str
 ) -> bool:
     """Sends email using Gmail API instead of SMTP/Passwords."""
+    # Imported on first OAuth send: most workers never use the Gmail API
+    from google.oauth2.credentials import Credentials
+
     try:
         # 1. Rebuild credentials using the stored refresh token
         creds = Credentials(
@@ -284,13 +508,14 @@ async def send_oauth_email(
 
         # 2. Build the Gmail API service
         def _build_and_send():
+            # googleapiclient is slow to import; pay for it on the sender thread, not the event loop
+            from googleapiclient.discovery import build
             service = build('gmail', 'v1', credentials=creds)
 
             # 3. Construct the Message
-            message = MIMEMultipart('alternative')
+            message = MIMEText(html_body, 'html', 'utf-8')
             message['To'] = to_email
             message['Subject'] = subject
-            message.attach(MIMEText(html_body, 'html'))
             
             # Gmail API requires URL-safe base64 encoding
             raw_string = base64.urlsafe_b64encode(message.as_bytes()).decode()
@@ -302,7 +527,39 @@ async def send_oauth_email(
             ).execute()
             return True
             
-        return await asyncio.to_thread(_build_and_send)
+        return await _in_smtp_thread(_build_and_send)
     except Exception as e:
         print(f"[OAUTH EMAIL ERROR] Failed to send to {to_email}: {e}")
         return False
+
+
+# ── Bulk Dispatch ─────────────────────────────────────────
+# Provisioning sends one mail per employee. Sends are I/O-bound, so a bounded
+# fan-out hides SMTP/API latency; the bound matches the SMTP pool so each
+# in-flight send can hold a warm pooled connection.
+
+EMAIL_CONCURRENCY = _SMTP_POOL_SIZE
+
+
+async def _gather_bounded(calls: List[Callable[[], Awaitable[bool]]], concurrency: int) -> List[bool]:
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def _one(call: Callable[[], Awaitable[bool]]) -> bool:
+        async with sem:
+            try:
+                return await call()
+            except Exception as e:
+                print(f"[EMAIL ERROR] Bulk send failed: {e}")
+                return False
+
+    return list(await asyncio.gather(*(_one(c) for c in calls)))
+
+
+async def send_auth_emails_bulk(recipients: List[Dict[str, Any]], concurrency: int = EMAIL_CONCURRENCY) -> List[bool]:
+    """send_auth_email for each kwargs dict, `concurrency` at a time; results in input order."""
+    return await _gather_bounded([lambda r=r: send_auth_email(**r) for r in recipients], concurrency)
+
+
+async def send_oauth_emails_bulk(recipients: List[Dict[str, Any]], concurrency: int = EMAIL_CONCURRENCY) -> List[bool]:
+    """send_oauth_email for each kwargs dict, `concurrency` at a time; results in input order."""
+    return await _gather_bounded([lambda r=r: send_oauth_email(**r) for r in recipients], concurrency)
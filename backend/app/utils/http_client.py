@@ -0,0 +1,30 @@
+"""
+Botivate HR Support - Shared HTTP Client
+One keep-alive httpx.AsyncClient for every outbound API call (OpenAI via
+LangChain, etc.), created lazily and closed on application shutdown.
+"""
+
+from typing import Optional
+import httpx
+
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide AsyncClient, creating it on first use."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client (called from the FastAPI lifespan on shutdown)."""
+    global _client
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
@@ -3,11 +3,11 @@ from app.database import engine
 from app.models.models import Base
 
 async def reset():
-    print("Dropping all tables...")
+    # One transaction for drop + create: a single checkout and BEGIN/COMMIT
     async with engine.begin() as conn:
+        print("Dropping all tables...")
         await conn.run_sync(Base.metadata.drop_all)
-    print("Creating all tables...")
-    async with engine.begin() as conn:
+        print("Creating all tables...")
         await conn.run_sync(Base.metadata.create_all)
     print("Done!")
 
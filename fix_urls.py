@@ -1,30 +1,54 @@
+import mmap
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 
 directory = 'frontend/src'
 # Match strings like 'http://localhost:8000/api...' or `http://localhost:8000/api...`
-pattern = r"['\"`]http://localhost:8000([^'\"`]*?)['\"`]"
-
-total_replacements = 0
-
-for root, dirs, files in os.walk(directory):
-    if 'node_modules' in root: continue
-    for file in files:
-        if file.endswith(('.js', '.jsx')):
-            filepath = os.path.join(root, file)
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            def repl(m):
-                path = m.group(1)
-                # Ensure the path starts with a slash if not empty
-                return f"`${{import.meta.env.VITE_API_URL || 'http://localhost:8000'}}{path}`"
-            
-            new_content, count = re.subn(pattern, repl, content)
-            if count > 0:
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    f.write(new_content)
-                print(f'Updated {filepath}: {count} replacements')
-                total_replacements += count
+# Compiled once, on bytes, so files can be scanned without decoding them first
+pattern = re.compile(rb"['\"`]http://localhost:8000([^'\"`]*?)['\"`]")
+
+
+def repl(m):
+    path = m.group(1)
+    # Ensure the path starts with a slash if not empty
+    return b"`${import.meta.env.VITE_API_URL || 'http://localhost:8000'}" + path + b"`"
+
+
+def fix_file(filepath):
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Most files have no match: skip them without reading into memory or rewriting
+            if not pattern.search(mm):
+                return 0
+            content = mm[:]
+
+    new_content, count = pattern.subn(repl, content)
+    if count > 0:
+        with open(filepath, 'wb') as f:
+            f.write(new_content)
+        print(f'Updated {filepath}: {count} replacements')
+    return count
+
+
+# Pruned before descending, so dependency/build trees are never listed at all
+skip_dirs = {'node_modules', '.git', 'dist', 'build'}
+
+
+def source_files(root):
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name in skip_dirs: continue
+                yield from source_files(entry.path)
+            elif entry.name.endswith(('.js', '.jsx')):
+                yield entry.path
+
+
+# Many small files, all disk I/O: scan them concurrently
+with ThreadPoolExecutor() as pool:
+    total_replacements = sum(pool.map(fix_file, source_files(directory)))
 
 print(f"Total urls converted: {total_replacements}")